@@ -1,16 +1,89 @@
+from django import forms
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import (
+    BooleanField,
+    Case,
+    Exists,
+    F,
+    OuterRef,
+    Value,
+    When,
+)
 from django_filters import rest_framework as filters
+from rest_framework.filters import OrderingFilter
 
-from recipes.models import Recipe, Tag
+from core.catalog import get_catalog
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart
+
+
+class IntegerInFilter(filters.BaseInFilter, filters.Filter):
+    """Фильтр по списку целых чисел, разделенных запятыми."""
+
+    field_class = forms.IntegerField
+
+
+class IngredientFilter(filters.FilterSet):
+    """
+    Автодополнение ингредиентов по наименованию: сначала совпадения
+    по началу наименования, затем по подстроке. Количество подсказок
+    ограничивает IngredientViewSet.list: к срезу запроса нельзя применить
+    другие фильтры и поиск объекта по pk.
+    """
+
+    name = filters.CharFilter(method="filter_name")
+
+    class Meta:
+        model = Ingredient
+        fields = ("name",)
+
+    def filter_name(self, queryset, name, value):
+        if not value:
+            return queryset
+        return (
+            queryset.filter(name__icontains=value)
+            .annotate(
+                is_prefix=Case(
+                    When(name__istartswith=value, then=Value(True)),
+                    default=Value(False),
+                    output_field=BooleanField(),
+                )
+            )
+            .order_by("-is_prefix", "name")
+        )
+
+
+def get_tag_choices():
+    """Варианты фильтра по тэгам из каталога справочников."""
+    tags_by_slug = get_catalog().tags_by_slug
+    return [(slug, tag.name) for slug, tag in tags_by_slug.items()]
 
 
 class RecipeFilter(filters.FilterSet):
+    """
+    Фильтр рецептов. Фильтрация по тэгам, избранному и корзине выполняется
+    полусоединениями (EXISTS), поэтому не размножает строки рецептов.
+    """
+
+    TAGS_MODE_ANY: str = "any"
+    TAGS_MODE_ALL: str = "all"
+
     author = filters.CharFilter()
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name="tags__slug",
-        to_field_name="slug",
-        queryset=Tag.objects.all(),
+    tags = filters.MultipleChoiceFilter(
+        choices=get_tag_choices, method="filter_tags"
+    )
+    # any - рецепты с любым из тэгов, all - рецепты со всеми тэгами
+    tags_mode = filters.ChoiceFilter(
+        choices=(
+            (TAGS_MODE_ANY, TAGS_MODE_ANY),
+            (TAGS_MODE_ALL, TAGS_MODE_ALL),
+        ),
+        method="filter_tags_mode",
     )
 
+    # рецепты со всеми ингредиентами ingredients и без exclude_ingredients
+    ingredients = IntegerInFilter(method="filter_ingredients")
+    exclude_ingredients = IntegerInFilter(method="filter_exclude_ingredients")
+    search = filters.CharFilter(method="filter_search")
     is_favorited = filters.BooleanFilter(method="filter_is_favorited")
     is_in_shopping_cart = filters.BooleanFilter(
         method="filter_is_in_shopping_cart"
@@ -20,12 +93,75 @@ class RecipeFilter(filters.FilterSet):
         model = Recipe
         fields = ["author", "tags"]
 
-    def filter_is_favorited(self, queryset, name, value):
-        if value:
-            return queryset.filter(favorites__user=self.request.user)
+    def filter_tags(self, queryset, name, value):
+        tags_by_slug = get_catalog().tags_by_slug
+        tag_ids = {tags_by_slug[slug].pk for slug in value}
+        recipe_tags = Recipe.tags.through.objects.filter(recipe=OuterRef("pk"))
+        if self.form.cleaned_data.get("tags_mode") == self.TAGS_MODE_ALL:
+            for tag_id in tag_ids:
+                queryset = queryset.filter(
+                    Exists(recipe_tags.filter(tag_id=tag_id))
+                )
+            return queryset
+        return queryset.filter(Exists(recipe_tags.filter(tag_id__in=tag_ids)))
+
+    def filter_tags_mode(self, queryset, name, value):
+        # Режим учитывается в filter_tags
         return queryset
 
+    def filter_ingredients(self, queryset, name, value):
+        return queryset.filter(ingredient_ids__contains=sorted(set(value)))
+
+    def filter_exclude_ingredients(self, queryset, name, value):
+        return queryset.exclude(ingredient_ids__overlap=sorted(set(value)))
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по наименованию и описанию рецепта."""
+        query = SearchQuery(value, config="russian", search_type="websearch")
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(rank=SearchRank(F("search_vector"), query))
+            .order_by("-rank", "-pub_date")
+        )
+
+    def filter_is_favorited(self, queryset, name, value):
+        if not value:
+            return queryset
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.none()
+        return queryset.filter(
+            Exists(Favorite.objects.filter(user=user, recipe=OuterRef("pk")))
+        )
+
     def filter_is_in_shopping_cart(self, queryset, name, value):
-        if value:
-            return queryset.filter(in_shopping_carts__user=self.request.user)
-        return queryset
+        if not value:
+            return queryset
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.none()
+        return queryset.filter(
+            Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef("pk"))
+            )
+        )
+
+
+class RecipeOrderingFilter(OrderingFilter):
+    """
+    Сортировка рецептов по полям ordering_fields представления.
+    Рецепты с равными значениями упорядочиваются от новых к старым,
+    как в индексах по этим полям.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering:
+            ordering = (*ordering, "-pub_date", "-id")
+        return ordering
+
+    @classmethod
+    def is_requested(cls, request, field: str) -> bool:
+        """Запрошена ли сортировка по полю field."""
+        params = request.query_params.get(cls.ordering_param, "").split(",")
+        return field in (param.strip().lstrip("-") for param in params)
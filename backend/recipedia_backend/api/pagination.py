@@ -1,4 +1,71 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from core.constants import Limits, Messages
+
+
+def estimate_count(queryset):
+    """
+    Возвращает оценку количества записей таблицы модели по статистике
+    планировщика PostgreSQL или None, если оценка недоступна.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if not row or row[0] < 0:
+        return None
+    return row[0]
+
+
+class CountStrategyPaginator(Paginator):
+    """
+    Пагинатор с приближенным подсчетом записей: для списков без фильтров
+    используется оценка планировщика, для отфильтрованных - кэшированный
+    на короткое время результат COUNT(*).
+    """
+
+    def __init__(self, object_list, per_page, count_cache_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_cache_key = count_cache_key
+        self.count_is_exact = True
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, "query"):
+            return super().count
+        if not queryset.query.where:
+            estimate = estimate_count(queryset)
+            if (
+                estimate is not None
+                and estimate >= Limits.COUNT_ESTIMATE_THRESHOLD
+            ):
+                self.count_is_exact = False
+                return estimate
+            return super().count
+        if self.count_cache_key is None:
+            return super().count
+        count = cache.get(self.count_cache_key)
+        if count is not None:
+            self.count_is_exact = False
+            return count
+        count = super().count
+        cache.set(self.count_cache_key, count, Limits.COUNT_CACHE_TIMEOUT)
+        return count
 
 
 class PageLimitPagination(PageNumberPagination):
@@ -6,3 +73,74 @@ class PageLimitPagination(PageNumberPagination):
     page_size_query_param = "limit"
     max_page_size = 100
     page_size = 6
+
+    def get_count_cache_key(self, request) -> str:
+        """Ключ кэша количества записей по нормализованным параметрам."""
+        params = sorted(
+            (key, sorted(request.query_params.getlist(key)))
+            for key in request.query_params
+            if key not in (self.page_query_param, self.page_size_query_param)
+        )
+        raw_key = f"{request.path}:{request.user.pk}:{params}"
+        return "count:" + hashlib.md5(raw_key.encode()).hexdigest()
+
+    def django_paginator_class(self, object_list, per_page):
+        return CountStrategyPaginator(
+            object_list,
+            per_page,
+            count_cache_key=self.get_count_cache_key(self.request),
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.page.paginator.count,
+                "count_is_exact": self.page.paginator.count_is_exact,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count_is_exact"] = {
+            "type": "boolean",
+            "example": True,
+        }
+        return response_schema
+
+
+class RecipeCursorPagination(CursorPagination):
+    """
+    Курсорная пагинация рецептов по (-pub_date, -id), без подсчета записей.
+    Включается параметром запроса pagination=cursor. Другие сортировки не
+    поддерживаются: курсор по изменяемому полю (favorites_count) пропускал
+    бы и повторял рецепты между страницами.
+    """
+
+    mode_query_param = "pagination"
+    mode = "cursor"
+    page_size_query_param = "limit"
+    max_page_size = 100
+    page_size = 6
+    ordering = ("-pub_date", "-id")
+
+    @classmethod
+    def is_requested(cls, request) -> bool:
+        return request.query_params.get(cls.mode_query_param) == cls.mode
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            raise ValidationError(
+                {"ordering": [Messages.ORDERING_WITH_CURSOR]}
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        # Сортировка фильтра представления не используется
+        return self.ordering
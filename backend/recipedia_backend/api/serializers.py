@@ -1,22 +1,36 @@
 import base64
+import binascii
+import os
+import re
+from collections import defaultdict
 
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.uploadedfile import TemporaryUploadedFile
 from django.core.validators import EmailValidator, RegexValidator
+from django.db import transaction
+from django.db.models import Manager, prefetch_related_objects
 from djoser.serializers import UserCreateSerializer, UserSerializer
+from PIL import Image
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator, UniqueValidator
 
+from core.cache import get_recipe_representations
+from core.catalog import get_catalog
 from core.constants import Limits, Messages
+from core.images import get_variant_urls
 from recipes.models import (
     Favorite,
     Ingredient,
+    PantryIngredient,
     Recipe,
     RecipeIngredient,
     ShoppingCart,
+    ShoppingListItem,
     Subscription,
     Tag,
 )
+from recipes.signals import bump_carts_on_commit
 
 User = get_user_model()
 
@@ -48,10 +62,38 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "measurement_unit", "amount")
 
 
+class CatalogPrimaryKeyField(serializers.IntegerField):
+    """
+    Id объекта справочника. Поле проверяет только формат id: наличие
+    объектов проверяется сериализатором рецепта сразу для всех id.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("min_value", 1)
+        super().__init__(**kwargs)
+
+
+def get_catalog_objects(objects: dict, model, pks, message: str) -> list:
+    """
+    Возвращает объекты справочника по pks. Объекты, которых нет
+    в каталоге objects, запрашиваются одним запросом; если части
+    объектов нет и в базе данных, ошибка перечисляет все их id.
+    """
+    missing = set(pks) - objects.keys()
+    if missing:
+        objects = {**objects, **model.objects.in_bulk(missing)}
+        missing -= objects.keys()
+        if missing:
+            raise serializers.ValidationError(
+                message.format(", ".join(map(str, sorted(missing))))
+            )
+    return [objects[pk] for pk in pks]
+
+
 class RecipeIngredientWriteSerializer(serializers.Serializer):
     """Сериализатор для создания/изменения ингредиентов рецепта."""
 
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = CatalogPrimaryKeyField()
     amount = serializers.IntegerField(
         min_value=Limits.AMOUNT_MIN, max_value=Limits.AMOUNT_MAX
     )
@@ -128,8 +170,11 @@ class CustomUserSerializer(UserSerializer):
     def get_is_subscribed(self, author: User) -> bool:
         """Возвращает признак, подписан ли текущий пользователь на автора."""
         user = self.context.get("request").user
-        if not user.is_authenticated:
+        if not user.is_authenticated or user == author:
             return False
+        # Признак аннотирован в UserQuerySet.with_is_subscribed
+        if hasattr(author, "is_subscribed"):
+            return author.is_subscribed
         return user.subscriptions.filter(author=author).exists()
 
 
@@ -141,20 +186,100 @@ class TagSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
-    """Сериализатор для чтения рецепта."""
+class RecipeAuthorSerializer(serializers.ModelSerializer):
+    """Сериализатор автора в общей части представления рецепта."""
 
-    tags = TagSerializer(read_only=True, many=True)
-    author = CustomUserSerializer(read_only=True)
+    class Meta:
+        model = User
+        fields = ("email", "id", "username", "first_name", "last_name")
+
+
+class RecipeBaseSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор общей для всех пользователей части представления рецепта.
+    Результат кэшируется, поэтому сериализатор вызывается без запроса,
+    и ссылка на картинку в нем остается относительной.
+    """
+
+    tags = TagSerializer(read_only=True, many=True, source="catalog_tags")
+    author = RecipeAuthorSerializer(read_only=True)
     ingredients = RecipeIngredientSerializer(
         read_only=True, many=True, source="recipeingredient_set"
     )
-    is_favorited = serializers.SerializerMethodField()
-    is_in_shopping_cart = serializers.SerializerMethodField()
     text = serializers.SerializerMethodField(method_name="get_formatted_text")
+    images = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
+        fields = (
+            "id",
+            "tags",
+            "author",
+            "ingredients",
+            "name",
+            "image",
+            "images",
+            "text",
+            "cooking_time",
+        )
+
+    def get_formatted_text(self, recipe: Recipe) -> str:
+        return recipe.get_formatted_text()
+
+    def get_images(self, recipe: Recipe) -> dict:
+        return get_variant_urls(recipe)
+
+    @classmethod
+    def build(cls, recipes: list[Recipe]) -> dict:
+        """
+        Возвращает представления рецептов, подгружая связанные объекты.
+        Тэги и ингредиенты берутся из каталога справочников.
+        """
+        catalog = get_catalog()
+        prefetch_related_objects(recipes, "author", "recipeingredient_set")
+        recipe_tag_ids = list(
+            Recipe.tags.through.objects.filter(recipe__in=recipes).values_list(
+                "recipe_id", "tag_id"
+            )
+        )
+        tags = dict(catalog.tags)
+        missing = {tag_id for _, tag_id in recipe_tag_ids} - tags.keys()
+        if missing:
+            tags.update(Tag.objects.in_bulk(missing))
+        recipe_tags = defaultdict(list)
+        for recipe_id, tag_id in recipe_tag_ids:
+            recipe_tags[recipe_id].append(tags[tag_id])
+        for recipe in recipes:
+            recipe.catalog_tags = sorted(
+                recipe_tags[recipe.pk], key=lambda tag: tag.name
+            )
+            for item in recipe.recipeingredient_set.all():
+                if item.ingredient_id in catalog.ingredients:
+                    item.ingredient = catalog.ingredients[item.ingredient_id]
+        return {recipe.pk: cls(recipe).data for recipe in recipes}
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    """Сериализатор списка рецептов."""
+
+    def to_representation(self, data):
+        if isinstance(data, Manager):
+            data = data.all()
+        return self.child.represent_many(list(data))
+
+
+class RecipeReadSerializer(RecipeBaseSerializer):
+    """
+    Сериализатор для чтения рецепта.
+    Общая часть представления берется из кэша, признаки текущего
+    пользователя добавляются к ней при формировании ответа.
+    """
+
+    author = CustomUserSerializer(read_only=True)
+    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.SerializerMethodField()
+
+    class Meta(RecipeBaseSerializer.Meta):
         fields = (
             "id",
             "tags",
@@ -164,53 +289,196 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "images",
             "text",
             "cooking_time",
         )
+        list_serializer_class = RecipeListSerializer
 
     def get_is_favorited(self, recipe: Recipe) -> bool:
         user = self.context.get("request").user
         if not user.is_authenticated:
             return False
+        # Признак аннотирован в RecipeQuerySet.with_user_flags
+        if hasattr(recipe, "is_favorited"):
+            return recipe.is_favorited
         return user.favorites.filter(recipe=recipe).exists()
 
     def get_is_in_shopping_cart(self, recipe: Recipe) -> bool:
         user = self.context.get("request").user
         if not user.is_authenticated:
             return False
+        if hasattr(recipe, "is_in_shopping_cart"):
+            return recipe.is_in_shopping_cart
         return user.shopping_carts.filter(recipe=recipe).exists()
 
-    def get_formatted_text(self, recipe: Recipe) -> str:
-        return recipe.get_formatted_text()
+    def get_subscribed_author_ids(self, recipes: list[Recipe]) -> set:
+        """Возвращает id авторов рецептов, на которых подписан пользователь."""
+        user = self.context.get("request").user
+        if not user.is_authenticated:
+            return set()
+        return set(
+            user.subscriptions.filter(
+                author__in={recipe.author_id for recipe in recipes}
+            ).values_list("author_id", flat=True)
+        )
+
+    def personalize(self, data: dict, recipe: Recipe, subscribed: set):
+        """Дополняет общую часть представления признаками пользователя."""
+        request = self.context.get("request")
+        personal = {
+            "author": {
+                **data["author"],
+                "is_subscribed": data["author"]["id"] in subscribed,
+            },
+            "is_favorited": self.get_is_favorited(recipe),
+            "is_in_shopping_cart": self.get_is_in_shopping_cart(recipe),
+        }
+        if request is not None:
+            if data["image"]:
+                personal["image"] = request.build_absolute_uri(data["image"])
+            personal["images"] = {
+                variant: request.build_absolute_uri(url)
+                for variant, url in data["images"].items()
+            }
+        return {
+            field: personal[field] if field in personal else data[field]
+            for field in self.Meta.fields
+        }
+
+    def represent_many(self, recipes: list[Recipe]) -> list:
+        base = get_recipe_representations(recipes, RecipeBaseSerializer.build)
+        subscribed = self.get_subscribed_author_ids(recipes)
+        return [
+            self.personalize(base[recipe.pk], recipe, subscribed)
+            for recipe in recipes
+        ]
+
+    def to_representation(self, recipe: Recipe):
+        return self.represent_many([recipe])[0]
 
 
 class RecipeMinifiedSerializer(serializers.ModelSerializer):
     """Сериализатор краткой формы рецепта для избранного, подписок."""
 
+    images = serializers.SerializerMethodField()
+
     class Meta:
         model = Recipe
-        fields = ("id", "name", "image", "cooking_time")
+        fields = ("id", "name", "image", "images", "cooking_time")
+
+    def get_images(self, recipe: Recipe) -> dict:
+        request = self.context.get("request")
+        urls = get_variant_urls(recipe)
+        if request is None:
+            return urls
+        return {
+            variant: request.build_absolute_uri(url)
+            for variant, url in urls.items()
+        }
 
 
 class Base64ImageField(serializers.ImageField):
-    """Сериализатор картинки блюда."""
+    """
+    Сериализатор картинки блюда: файл multipart-запроса или строка
+    data:image/<формат>;base64,<данные>. Строка декодируется частями во
+    временный файл, размер в пикселях проверяется по заголовку картинки
+    до полной проверки средствами ImageField. Проверка выполняется в
+    запросе: он все равно ожидает ее результата, а проверка заголовка
+    ограничивает ее стоимость. Файл отклоненной картинки закрывается.
+    """
 
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith("data:image"):
-            format, imgstr = data.split(";base64,")
-            ext = format.split("/")[-1]
-
-            data = ContentFile(base64.b64decode(imgstr), name="temp." + ext)
-
-        return super().to_internal_value(data)
+            data = self.decode(data)
+        try:
+            if getattr(data, "size", 0) > Limits.IMAGE_MAX_SIZE:
+                raise serializers.ValidationError(
+                    Messages.IMAGE_TOO_LARGE.format(
+                        Limits.IMAGE_MAX_SIZE // 1024 // 1024
+                    )
+                )
+            if hasattr(data, "seek"):
+                self.check_pixels(data)
+            return super().to_internal_value(data)
+        except (serializers.ValidationError, DjangoValidationError):
+            self.close(data)
+            raise
+
+    @staticmethod
+    def close(data) -> None:
+        """Закрывает файл картинки (временный файл удаляется)."""
+        if hasattr(data, "close"):
+            data.close()
+
+    def decode(self, data: str) -> TemporaryUploadedFile:
+        """Декодирует строку base64 во временный файл частями."""
+        header, _, encoded = data.partition(";base64,")
+        if re.search(r"\s", encoded):
+            encoded = "".join(encoded.split())
+        if len(encoded) // 4 * 3 > Limits.IMAGE_MAX_SIZE:
+            raise serializers.ValidationError(
+                Messages.IMAGE_TOO_LARGE.format(
+                    Limits.IMAGE_MAX_SIZE // 1024 // 1024
+                )
+            )
+        content_type = header.partition(":")[2]
+        file = TemporaryUploadedFile(
+            "temp." + content_type.split("/")[-1], content_type, 0, None
+        )
+        # Размер части кратен 4, чтобы части декодировались независимо
+        chunk_size = Limits.IMAGE_DECODE_CHUNK_SIZE // 4 * 4
+        checked = False
+        try:
+            for start in range(0, len(encoded), chunk_size):
+                end = start + chunk_size
+                file.write(base64.b64decode(encoded[start:end], validate=True))
+                if not checked:
+                    # Заголовок картинки обычно умещается в первую часть:
+                    # слишком большая картинка отклоняется до декодирования
+                    # остальных данных
+                    file.flush()
+                    checked = self.check_pixels(file)
+                    file.seek(0, os.SEEK_END)
+        except binascii.Error:
+            file.close()
+            self.fail("invalid_image")
+        except serializers.ValidationError:
+            file.close()
+            raise
+        file.size = file.tell()
+        file.seek(0)
+        return file
+
+    def check_pixels(self, file) -> bool:
+        """
+        Проверяет размер картинки в пикселях по ее заголовку, не
+        декодируя изображение. Возвращает False, если заголовок
+        прочитать не удалось.
+        """
+        file.seek(0)
+        try:
+            with Image.open(file) as image:
+                width, height = image.size
+        except Image.DecompressionBombError:
+            width, height = Limits.IMAGE_MAX_PIXELS + 1, 1
+        except Exception:
+            return False
+        finally:
+            file.seek(0)
+        if width * height > Limits.IMAGE_MAX_PIXELS:
+            raise serializers.ValidationError(
+                Messages.IMAGE_TOO_MANY_PIXELS.format(Limits.IMAGE_MAX_PIXELS)
+            )
+        return True
 
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
     """Сериализатор для создания/изменения рецепта."""
 
     ingredients = RecipeIngredientWriteSerializer(many=True, allow_empty=False)
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True, allow_empty=False
+    tags = serializers.ListField(
+        child=CatalogPrimaryKeyField(), allow_empty=False
     )
     image = Base64ImageField(allow_null=False)
     name = serializers.CharField(max_length=Limits.RECIPE_NAME_LENGTH)
@@ -229,19 +497,59 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             "cooking_time",
         )
 
-    def add_tags(self, recipe: Recipe, tags: list[Tag]):
-        for tag in tags:
-            recipe.tags.add(tag)
-
-    def add_ingredients(self, recipe: Recipe, ingredients_data):
-        ingredients_models = [
+    def set_ingredients(self, recipe: Recipe, ingredients_data):
+        """
+        Приводит ингредиенты рецепта к ingredients_data, изменяя только
+        отличающиеся строки: новые добавляются, измененные обновляются,
+        лишние удаляются.
+        """
+        amounts = {item["id"].pk: item["amount"] for item in ingredients_data}
+        current = {}
+        # Удаляемые строки, в том числе повторы ингредиента, добавленные
+        # в обход сериализатора, обрабатываются сигналами post_delete
+        to_delete = []
+        for item in recipe.recipeingredient_set.all():
+            ingredient_id = item.ingredient_id
+            if ingredient_id in amounts and ingredient_id not in current:
+                current[ingredient_id] = item
+            else:
+                to_delete.append(item.pk)
+        to_create = [
             RecipeIngredient(
-                ingredient=item["id"], amount=item["amount"], recipe=recipe
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount
             )
-            for item in ingredients_data
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in current
         ]
-        RecipeIngredient.objects.bulk_create(ingredients_models)
-
+        to_update = []
+        # bulk_create и bulk_update не отправляют сигналы, поэтому
+        # изменения списков покупок от них применяются здесь
+        deltas = {item.ingredient_id: item.amount for item in to_create}
+        for ingredient_id, item in current.items():
+            if amounts[ingredient_id] != item.amount:
+                deltas[ingredient_id] = amounts[ingredient_id] - item.amount
+                item.amount = amounts[ingredient_id]
+                to_update.append(item)
+        if to_delete:
+            RecipeIngredient.objects.filter(pk__in=to_delete).delete()
+        RecipeIngredient.objects.bulk_update(to_update, ["amount"])
+        RecipeIngredient.objects.bulk_create(to_create)
+        recipe.ingredient_ids = sorted(amounts)
+        if deltas:
+            ShoppingListItem.objects.add_ingredients(recipe.pk, deltas)
+            bump_carts_on_commit([recipe.pk])
+
+    def save(self, **kwargs):
+        try:
+            return super().save(**kwargs)
+        finally:
+            # Временный файл декодированной картинки закрывается сразу,
+            # а не при сборке мусора
+            image = self.validated_data.get("image")
+            if image is not None:
+                image.close()
+
+    @transaction.atomic
     def create(self, validated_data):
         """Создание рецепта."""
 
@@ -249,20 +557,22 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         ingredients = validated_data.pop("ingredients")
         user = self.context.get("request").user
         recipe = Recipe.objects.create(author=user, **validated_data)
-        self.add_tags(recipe, tags)
-        self.add_ingredients(recipe, ingredients)
+        recipe.tags.set(tags)
+        self.set_ingredients(recipe, ingredients)
         recipe.save()
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
-        """Обновление рецепта."""
+        """
+        Обновление рецепта: теги и ингредиенты изменяются по разнице
+        с текущими, без удаления и повторной вставки всех строк.
+        """
 
         tags = validated_data.pop("tags")
         ingredients = validated_data.pop("ingredients")
-        recipe.tags.clear()
-        recipe.ingredients.clear()
-        self.add_tags(recipe, tags)
-        self.add_ingredients(recipe, ingredients)
+        recipe.tags.set(tags)
+        self.set_ingredients(recipe, ingredients)
         fields = ["image", "name", "text", "cooking_time"]
         for field in fields:
             setattr(recipe, field, validated_data.get(field))
@@ -285,6 +595,30 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 "Recipe without ingredients forbidden"
             )
+        # Наличие тэгов и ингредиентов проверяется по каталогу сразу
+        # для всех id, без запроса к базе данных на каждый id
+        catalog = get_catalog()
+        errors = {}
+        try:
+            data["tags"] = get_catalog_objects(
+                catalog.tags, Tag, tags, Messages.TAGS_DO_NOT_EXIST
+            )
+        except serializers.ValidationError as error:
+            errors["tags"] = error.detail
+        try:
+            found = get_catalog_objects(
+                catalog.ingredients,
+                Ingredient,
+                ingredient_ids,
+                Messages.INGREDIENTS_DO_NOT_EXIST,
+            )
+        except serializers.ValidationError as error:
+            errors["ingredients"] = error.detail
+        else:
+            for item, ingredient in zip(ingredients, found):
+                item["id"] = ingredient
+        if errors:
+            raise serializers.ValidationError(errors)
         return data
 
     def to_representation(self, instance):
@@ -342,20 +676,30 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         user = self.context.get("request").user
         if not user.is_authenticated:
             return False
+        if hasattr(author, "is_subscribed"):
+            return author.is_subscribed
         return user.subscriptions.filter(author=author).exists()
 
     def get_recipes(self, author: User):
         request = self.context.get("request")
-        recipes_limit = int(request.query_params.get("recipes_limit", "0"))
-        author_recipes = author.recipes.all()
-        if recipes_limit:
-            author_recipes = author_recipes[:recipes_limit]
+        # Рецепты подгружены в UserSubscriptionAPIView.get_queryset
+        if hasattr(author, "last_recipes"):
+            author_recipes = author.last_recipes
+        else:
+            recipes_limit = int(
+                request.query_params.get("recipes_limit", "0")
+            )
+            author_recipes = author.recipes.all()
+            if recipes_limit:
+                author_recipes = author_recipes[:recipes_limit]
         return RecipeMinifiedSerializer(
             author_recipes, many=True, context={"request": request}
         ).data
 
     def get_recipes_count(self, author: User) -> int:
         """Возвращает общее количество рецептов автора."""
+        if hasattr(author, "recipes_count"):
+            return author.recipes_count
         return author.recipes.count()
 
 
@@ -399,3 +743,35 @@ class FavoriteSerializer(serializers.ModelSerializer):
         return RecipeMinifiedSerializer(
             instance.recipe, context={"request": self.context.get("request")}
         ).data
+
+
+class PantryIngredientSerializer(serializers.ModelSerializer):
+    """Сериализатор для добавления ингредиента в наличие."""
+
+    class Meta:
+        fields = ("user", "ingredient")
+        model = PantryIngredient
+
+        validators = (
+            UniqueTogetherValidator(
+                queryset=PantryIngredient.objects.all(),
+                fields=("user", "ingredient"),
+                message=Messages.INGREDIENT_ALREADY_IN_PANTRY,
+            ),
+        )
+
+    def to_representation(self, instance):
+        return IngredientSerializer(instance.ingredient).data
+
+
+class ShoppingListItemSerializer(serializers.ModelSerializer):
+    """Сериализатор для чтения строки списка покупок."""
+
+    id = serializers.IntegerField(source="ingredient.id")
+    name = serializers.CharField(source="ingredient.name")
+    measurement_unit = serializers.CharField(source="ingredient.unit.name")
+
+    class Meta:
+        model = ShoppingListItem
+        fields = ("id", "name", "measurement_unit", "amount")
+        read_only_fields = fields
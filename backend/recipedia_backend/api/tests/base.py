@@ -0,0 +1,96 @@
+import base64
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from PIL import Image
+from rest_framework.test import APIClient
+
+from core import catalog, pantry
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Subscription,
+    Tag,
+    Unit,
+)
+
+User = get_user_model()
+
+
+def image_data(size=(8, 8)) -> str:
+    """Картинка PNG в виде строки data:image/png;base64,..."""
+    buffer = BytesIO()
+    Image.new("RGB", size, "red").save(buffer, "PNG")
+    return (
+        "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+    )
+
+
+class RecipeDataTestCase(TestCase):
+    """
+    Тесты на общем наборе данных: авторы, тэги, ингредиенты и рецепты
+    с несколькими тэгами и ингредиентами.
+    Кэш и данные в памяти процесса сбрасываются перед каждым тестом,
+    поэтому каждый тест начинается с холодного кэша.
+    """
+
+    RECIPES_COUNT = 8
+
+    @classmethod
+    def setUpTestData(cls):
+        unit = Unit.objects.create(name="г")
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f"ингредиент {number}", unit=unit)
+            for number in range(10)
+        )
+        cls.tags = Tag.objects.bulk_create(
+            Tag(name=f"тэг {number}", color="#FFFFFF", slug=f"tag{number}")
+            for number in range(3)
+        )
+        cls.users = [
+            User.objects.create_user(
+                username=f"user{number}",
+                email=f"user{number}@example.com",
+                password="password",
+                first_name="Имя",
+                last_name="Фамилия",
+            )
+            for number in range(4)
+        ]
+        cls.user = cls.users[0]
+        cls.recipes = []
+        # Индекс ингредиентов рецептов обновляется после фиксации транзакции
+        with cls.captureOnCommitCallbacks(execute=True):
+            for number in range(cls.RECIPES_COUNT):
+                recipe = Recipe.objects.create(
+                    name=f"рецепт {number}",
+                    author=cls.users[1 + number % 3],
+                    text="строка 1\nстрока 2",
+                    cooking_time=10,
+                )
+                recipe.tags.set(cls.tags[: 1 + number % 3])
+                for ingredient in cls.ingredients[: 2 + number % 5]:
+                    RecipeIngredient.objects.create(
+                        recipe=recipe,
+                        ingredient=ingredient,
+                        amount=number + 1,
+                    )
+                cls.recipes.append(recipe)
+        for recipe in cls.recipes[::2]:
+            Favorite.objects.create(user=cls.user, recipe=recipe)
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.recipes[1])
+        for author in cls.users[1:]:
+            Subscription.objects.create(user=cls.user, author=author)
+
+    def setUp(self):
+        cache.clear()
+        catalog._catalog = None
+        pantry._matrix = None
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.anonymous = APIClient()
@@ -0,0 +1,25 @@
+from rest_framework.test import APIClient
+
+from .base import RecipeDataTestCase
+from recipes.models import Recipe
+
+
+class FavoritesCountTests(RecipeDataTestCase):
+    """Счетчик избранного рецепта не теряет изменений при сохранении."""
+
+    def test_stale_save_keeps_favorites_count(self):
+        """
+        Сохранение рецепта, прочитанного до добавления в избранное, не
+        перезаписывает счетчик прежним значением.
+        """
+        stale = Recipe.objects.get(pk=self.recipes[1].pk)
+        client = APIClient()
+        client.force_authenticate(self.users[2])
+        response = client.post(f"/api/recipes/{stale.pk}/favorite/")
+        self.assertEqual(response.status_code, 201)
+        stale.name = "новое название"
+        stale.save()
+        recipe = Recipe.objects.get(pk=stale.pk)
+        self.assertEqual(recipe.name, "новое название")
+        self.assertEqual(recipe.favorites_count, recipe.favorites.count())
+        self.assertEqual(recipe.favorites_count, stale.favorites_count + 1)
@@ -0,0 +1,42 @@
+import base64
+import os
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.test import SimpleTestCase
+from rest_framework import serializers
+
+from ..serializers import Base64ImageField
+from .base import image_data
+
+
+class Base64ImageFieldTests(SimpleTestCase):
+    def setUp(self):
+        self.field = Base64ImageField()
+        self.files = []
+        decode = self.field.decode
+
+        def tracked_decode(data):
+            file = decode(data)
+            self.files.append(file)
+            return file
+
+        self.field.decode = tracked_decode
+
+    def assertFileRemoved(self, file):
+        self.assertTrue(file.file.closed)
+        self.assertFalse(os.path.exists(file.temporary_file_path()))
+
+    def test_valid(self):
+        value = self.field.to_internal_value(image_data())
+        self.assertEqual(value.size, self.files[0].size)
+        self.assertFalse(value.closed)
+        value.close()
+
+    def test_invalid_image_closed(self):
+        with self.assertRaises(
+            (serializers.ValidationError, DjangoValidationError)
+        ):
+            self.field.to_internal_value(
+                "data:image/png;base64," + base64.b64encode(b"x").decode()
+            )
+        self.assertFileRemoved(self.files[0])
@@ -0,0 +1,37 @@
+from unittest import mock
+
+from .base import RecipeDataTestCase
+
+
+class IngredientAutocompleteTests(RecipeDataTestCase):
+    """Автодополнение ингредиентов по наименованию (параметр name)."""
+
+    URL = "/api/ingredients/"
+
+    def test_prefix_first(self):
+        response = self.client.get(f"{self.URL}?name=1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item["name"] for item in response.data], ["ингредиент 1"]
+        )
+
+    def test_limit(self):
+        with mock.patch("api.views.Limits.AUTOCOMPLETE_LIMIT", 3):
+            response = self.client.get(f"{self.URL}?name=ингредиент")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(len(self.client.get(self.URL).data), 10)
+
+    def test_detail_with_name(self):
+        """Фильтр name не ломает получение ингредиента по pk."""
+        ingredient = self.ingredients[2]
+        response = self.client.get(
+            f"{self.URL}{ingredient.pk}/?name=ингредиент"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["id"], ingredient.pk)
+
+    def test_name_with_search(self):
+        response = self.client.get(f"{self.URL}?name=ингредиент&search=2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 10)
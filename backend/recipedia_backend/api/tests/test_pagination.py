@@ -0,0 +1,43 @@
+from .base import RecipeDataTestCase
+from recipes.models import Recipe
+
+
+class CursorPaginationTests(RecipeDataTestCase):
+    """Курсорная пагинация рецептов (pagination=cursor)."""
+
+    URL = "/api/recipes/?pagination=cursor&limit=3"
+
+    def test_pages(self):
+        """Страницы по курсору содержат все рецепты без повторов."""
+        expected = list(
+            Recipe.objects.order_by("-pub_date", "-id").values_list(
+                "pk", flat=True
+            )
+        )
+        received = []
+        url = self.URL
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            received.extend(
+                recipe["id"] for recipe in response.data["results"]
+            )
+            url = response.data["next"]
+        self.assertEqual(received, expected)
+
+    def test_ordering_rejected(self):
+        """Сортировка вместе с курсором отклоняется, а не приводит к 500."""
+        for ordering in ("-favorites_count", "favorites_count", "-id"):
+            with self.subTest(ordering=ordering):
+                response = self.client.get(f"{self.URL}&ordering={ordering}")
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("ordering", response.data)
+
+    def test_filters(self):
+        """Фильтры рецептов применяются и при курсорной пагинации."""
+        response = self.client.get(f"{self.URL}&is_favorited=1")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["results"])
+        self.assertTrue(
+            all(recipe["is_favorited"] for recipe in response.data["results"])
+        )
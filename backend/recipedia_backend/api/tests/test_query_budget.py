@@ -0,0 +1,60 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .base import RecipeDataTestCase
+
+
+class QueryBudgetTests(RecipeDataTestCase):
+    """
+    Количество запросов к базе данных при чтении рецептов не зависит от
+    количества рецептов на странице, их тэгов и ингредиентов.
+    """
+
+    def count_queries(self, url: str, client=None) -> int:
+        client = client or self.client
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assertPageBudget(self, url: str, budget: int, client=None):
+        """
+        Проверяет бюджет запросов для страницы из одного рецепта и для
+        полной страницы: количество запросов должно совпадать.
+        """
+        separator = "&" if "?" in url else "?"
+        for limit in (1, self.RECIPES_COUNT):
+            self.setUp()
+            with self.subTest(url=url, limit=limit):
+                self.assertEqual(
+                    self.count_queries(
+                        f"{url}{separator}limit={limit}", client
+                    ),
+                    budget,
+                )
+
+    # Холодный кэш: бюджет включает загрузку каталога справочников (2
+    # запроса) и общей части представлений рецептов
+
+    def test_recipe_list(self):
+        self.assertPageBudget("/api/recipes/", 9)
+
+    def test_recipe_list_anonymous(self):
+        self.assertPageBudget("/api/recipes/", 8, self.anonymous)
+
+    def test_favorites(self):
+        self.assertPageBudget("/api/recipes/?is_favorited=1", 8)
+
+    def test_recipe_detail(self):
+        with self.assertNumQueries(7):
+            response = self.client.get(f"/api/recipes/{self.recipes[3].pk}/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_recipe_list_cached(self):
+        """Повторное чтение берет общую часть рецептов из кэша."""
+        self.count_queries("/api/recipes/")
+        with self.assertNumQueries(4):
+            self.client.get("/api/recipes/", HTTP_IF_NONE_MATCH="other")
+
+    def test_subscriptions(self):
+        self.assertPageBudget("/api/users/subscriptions/?recipes_limit=2", 3)
@@ -0,0 +1,90 @@
+from django.db import connection
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from ..filters import RecipeFilter
+from ..views import UserSubscriptionAPIView
+from .base import RecipeDataTestCase
+from recipes.models import Recipe
+
+# Узлы плана, означающие сортировку или устранение повторов по всему
+# результату соединения
+FORBIDDEN_NODES = ("Sort", "Unique", "HashAggregate", "GroupAggregate")
+
+
+class QueryPlanTests(RecipeDataTestCase):
+    """
+    Фильтры рецептов и список подписок выполняются без DISTINCT и без
+    сортировки или группировки результата соединения: существует план,
+    читающий строки в порядке индекса.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.factory = RequestFactory()
+
+    def get_request(self, params: dict) -> Request:
+        request = Request(self.factory.get("/", params))
+        request.user = self.user
+        return request
+
+    def assertPlanWithoutSort(self, queryset):
+        self.assertNotIn("DISTINCT", str(queryset.query))
+        with connection.cursor() as cursor:
+            # Планы с этими узлами выбираются только при отсутствии других
+            for option in ("enable_seqscan", "enable_sort", "enable_hashagg"):
+                cursor.execute(f"SET LOCAL {option} = off")
+        plan = queryset.explain()
+        for node in FORBIDDEN_NODES:
+            self.assertNotIn(node, plan)
+
+    def filter_recipes(self, params: dict):
+        request = self.get_request(params)
+        return RecipeFilter(
+            request.query_params,
+            queryset=Recipe.objects.all(),
+            request=request,
+        ).qs
+
+    def test_tags_any(self):
+        self.assertPlanWithoutSort(
+            self.filter_recipes({"tags": ["tag0", "tag1"]})
+        )
+
+    def test_tags_all(self):
+        self.assertPlanWithoutSort(
+            self.filter_recipes({"tags": ["tag0", "tag1"], "tags_mode": "all"})
+        )
+
+    def test_is_favorited(self):
+        self.assertPlanWithoutSort(self.filter_recipes({"is_favorited": "1"}))
+
+    def test_is_in_shopping_cart(self):
+        self.assertPlanWithoutSort(
+            self.filter_recipes({"is_in_shopping_cart": "1"})
+        )
+
+    def test_subscriptions(self):
+        view = UserSubscriptionAPIView()
+        view.request = self.get_request({"recipes_limit": 2})
+        self.assertPlanWithoutSort(view.get_queryset())
+
+    def test_tag_filter_results_are_not_duplicated(self):
+        pks = list(
+            self.filter_recipes(
+                {"tags": ["tag0", "tag1", "tag2"]}
+            ).values_list("pk", flat=True)
+        )
+        self.assertEqual(len(pks), len(set(pks)))
+        self.assertEqual(len(pks), self.RECIPES_COUNT)
+
+    def test_subscriptions_recipes_count(self):
+        response = self.client.get("/api/users/subscriptions/?recipes_limit=1")
+        counts = {
+            author["id"]: author["recipes_count"]
+            for author in response.data["results"]
+        }
+        self.assertEqual(
+            counts,
+            {author.pk: author.recipes.count() for author in self.users[1:]},
+        )
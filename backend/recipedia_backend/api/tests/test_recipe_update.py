@@ -0,0 +1,116 @@
+import shutil
+import tempfile
+
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from .base import RecipeDataTestCase, image_data
+from recipes.models import Recipe
+
+
+class RecipeUpdateTests(RecipeDataTestCase):
+    """
+    Изменение рецепта: строки тэгов и ингредиентов изменяются по разнице
+    с текущими, неизмененные строки сохраняются.
+    """
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # Рецепт 1: ингредиенты 0-2 с количеством 2, тэги 0-1
+        self.recipe = self.recipes[1]
+        self.author = APIClient()
+        self.author.force_authenticate(self.recipe.author)
+
+    def put(self, ingredients: dict, tags: list):
+        return self.author.put(
+            f"/api/recipes/{self.recipe.pk}/",
+            {
+                "ingredients": [
+                    {"id": ingredient.pk, "amount": amount}
+                    for ingredient, amount in ingredients.items()
+                ],
+                "tags": [tag.pk for tag in tags],
+                "image": image_data(),
+                "name": "новое название",
+                "text": "новый текст",
+                "cooking_time": 5,
+            },
+            format="json",
+        )
+
+    def get_rows(self) -> dict:
+        return {
+            row.ingredient_id: row
+            for row in self.recipe.recipeingredient_set.all()
+        }
+
+    def get_tag_rows(self) -> dict:
+        return dict(
+            Recipe.tags.through.objects.filter(recipe=self.recipe).values_list(
+                "tag", "pk"
+            )
+        )
+
+    def test_update_by_diff(self):
+        kept, changed, removed = self.ingredients[:3]
+        added = self.ingredients[5]
+        rows, tag_rows = self.get_rows(), self.get_tag_rows()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.put(
+                {kept: 2, changed: 7, added: 3}, self.tags[1:3]
+            )
+        self.assertEqual(response.status_code, 200)
+        new_rows = self.get_rows()
+        self.assertEqual(set(new_rows), {kept.pk, changed.pk, added.pk})
+        self.assertEqual(new_rows[kept.pk].pk, rows[kept.pk].pk)
+        self.assertEqual(new_rows[changed.pk].pk, rows[changed.pk].pk)
+        self.assertEqual(new_rows[changed.pk].amount, 7)
+        self.assertEqual(new_rows[added.pk].amount, 3)
+        self.assertNotIn(removed.pk, new_rows)
+        new_tag_rows = self.get_tag_rows()
+        self.assertEqual(set(new_tag_rows), {tag.pk for tag in self.tags[1:]})
+        self.assertEqual(
+            new_tag_rows[self.tags[1].pk], tag_rows[self.tags[1].pk]
+        )
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            self.recipe.ingredient_ids, sorted(new_rows), "ingredient_ids"
+        )
+        self.assertEqual(
+            {
+                item["id"]: item["amount"]
+                for item in response.data["ingredients"]
+            },
+            {kept.pk: 2, changed.pk: 7, added.pk: 3},
+        )
+
+    def test_unchanged(self):
+        """Повторное сохранение тех же ингредиентов не изменяет строки."""
+        rows = self.get_rows()
+        response = self.put(
+            {self.ingredients[number]: 2 for number in range(3)},
+            self.tags[:2],
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {
+                key: (row.pk, row.amount)
+                for key, row in self.get_rows().items()
+            },
+            {key: (row.pk, row.amount) for key, row in rows.items()},
+        )
+
+    def test_invalid_keeps_rows(self):
+        """Ошибка проверки не изменяет ингредиенты рецепта."""
+        rows = self.get_rows()
+        response = self.put({self.ingredients[0]: 0}, self.tags[:1])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            {key: row.pk for key, row in self.get_rows().items()},
+            {key: row.pk for key, row in rows.items()},
+        )
@@ -0,0 +1,160 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import override_settings
+from django.utils import timezone
+from reportlab.pdfbase import pdfmetrics
+from rest_framework.test import APIClient
+
+from .base import RecipeDataTestCase
+from core.utils import ShoppingList
+from recipes.models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+
+def run_now(key, func, *args, **kwargs):
+    """Выполняет фоновую задачу сразу, в потоке теста."""
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        pass
+
+
+@mock.patch("core.utils.submit_once", run_now)
+class ShoppingListPdfTests(RecipeDataTestCase):
+    """Формирование списка покупок в формате PDF."""
+
+    URL = "/api/recipes/download_shopping_cart/?file_format=pdf"
+
+    def test_pdf(self):
+        """Первый запрос ставит PDF в очередь, следующий получает его."""
+        self.user.first_name = "<b>Имя & <i>"
+        self.user.save()
+        self.assertEqual(self.client.get(self.URL).status_code, 202)
+        response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertTrue(response.content.startswith(b"%PDF"))
+
+    def test_pdf_date(self):
+        """PDF прошлого дня с его датой в заголовке не возвращается."""
+        today = timezone.localdate()
+        tomorrow = today + timedelta(days=1)
+        with mock.patch.object(
+            ShoppingList, "build_pdf", return_value=b"%PDF"
+        ) as build_pdf:
+            for date in (today, today, tomorrow, tomorrow):
+                with mock.patch(
+                    "core.utils.timezone.localdate", return_value=date
+                ):
+                    self.client.get(self.URL)
+        self.assertEqual(
+            [call.args[0] for call in build_pdf.call_args_list],
+            [
+                ShoppingList(self.user).get_title(date)
+                for date in (today, tomorrow)
+            ],
+        )
+        self.assertIn(str(tomorrow), build_pdf.call_args.args[0])
+
+    @override_settings(PDF_FONT="/nonexistent/font.ttf")
+    def test_pdf_failed(self):
+        """Ошибка формирования PDF возвращается ответом 500, а не 202."""
+        with mock.patch.object(
+            pdfmetrics, "getRegisteredFontNames", return_value=[]
+        ):
+            self.assertEqual(self.client.get(self.URL).status_code, 202)
+            response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("detail", response.data)
+
+
+class ShoppingListItemTests(RecipeDataTestCase):
+    """
+    Списки покупок ShoppingListItem изменяются на разницу при изменении
+    корзины и ингредиентов рецептов и совпадают с пересчетом по корзинам.
+    """
+
+    def assertListsMatchCarts(self):
+        user_ids = [user.pk for user in self.users]
+        self.assertEqual(
+            ShoppingListItem.objects.stored_amounts(user_ids),
+            ShoppingListItem.objects.expected_amounts(user_ids),
+        )
+
+    def test_initial(self):
+        self.assertTrue(ShoppingListItem.objects.filter(user=self.user))
+        self.assertListsMatchCarts()
+
+    def test_cart_changes(self):
+        other = APIClient()
+        other.force_authenticate(self.users[1])
+        url = f"/api/recipes/{self.recipes[3].pk}/shopping_cart/"
+        for client, method, code in (
+            (self.client, "post", 201),
+            (other, "post", 201),
+            (self.client, "delete", 204),
+            (other, "delete", 204),
+        ):
+            with self.subTest(method=method):
+                response = getattr(client, method)(url)
+                self.assertEqual(response.status_code, code)
+                self.assertListsMatchCarts()
+        self.assertFalse(ShoppingListItem.objects.filter(user=self.users[1]))
+
+    def test_recipe_ingredients_changed(self):
+        recipe = self.recipes[1]
+        row = RecipeIngredient.objects.filter(recipe=recipe).first()
+        row.amount += 5
+        row.save()
+        self.assertListsMatchCarts()
+        row.ingredient = self.ingredients[9]
+        row.save()
+        self.assertListsMatchCarts()
+        # Повтор ингредиента, добавленный в обход сериализатора
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=self.ingredients[9], amount=4
+        )
+        self.assertListsMatchCarts()
+        row.delete()
+        self.assertListsMatchCarts()
+
+    def test_row_moved_to_other_recipe(self):
+        """Перенос строки ингредиента в другой рецепт (в админке)."""
+        ShoppingCart.objects.create(user=self.users[1], recipe=self.recipes[2])
+        row = RecipeIngredient.objects.filter(recipe=self.recipes[1]).first()
+        row.recipe = self.recipes[2]
+        row.save()
+        self.assertListsMatchCarts()
+        row.recipe = self.recipes[1]
+        row.amount += 1
+        row.save()
+        self.assertListsMatchCarts()
+
+    def test_reconcile(self):
+        """Расхождения с пересчетом по корзинам находятся и исправляются."""
+        item = ShoppingListItem.objects.filter(user=self.user).first()
+        item.amount += 1
+        item.save()
+        ShoppingListItem.objects.filter(user=self.users[2]).delete()
+        ShoppingCart.objects.bulk_create(
+            [ShoppingCart(user=self.users[2], recipe=self.recipes[0])]
+        )
+        user_ids = ShoppingListItem.objects.owner_ids()
+        mismatches = ShoppingListItem.objects.reconcile(user_ids, True)
+        self.assertEqual(
+            mismatches[self.user.pk, item.ingredient_id],
+            (item.amount, item.amount - 1),
+        )
+        self.assertEqual(
+            {user for user, _ in mismatches}, {self.user.pk, self.users[2].pk}
+        )
+        self.assertEqual(
+            ShoppingListItem.objects.reconcile(user_ids), mismatches
+        )
+        self.assertListsMatchCarts()
+        self.assertEqual(ShoppingListItem.objects.reconcile(user_ids), {})
+
+    def test_recipe_deleted(self):
+        self.recipes[1].delete()
+        self.assertListsMatchCarts()
+        self.assertFalse(ShoppingListItem.objects.filter(user=self.user))
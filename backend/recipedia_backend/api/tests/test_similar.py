@@ -0,0 +1,17 @@
+from .base import RecipeDataTestCase
+from recipes.models import SimilarRecipe
+
+
+class SimilarRecipesTests(RecipeDataTestCase):
+    """Похожие рецепты."""
+
+    def test_similar(self):
+        recipe, similar = self.recipes[:2]
+        SimilarRecipe.objects.create(recipe=recipe, similar=similar, score=1)
+        response = self.client.get(f"/api/recipes/{recipe.pk}/similar/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["id"] for item in response.data], [similar.pk])
+
+    def test_not_found(self):
+        response = self.client.get("/api/recipes/999999/similar/")
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,66 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.utils import timezone
+
+from .base import RecipeDataTestCase
+from core.constants import Limits
+from core.trends import trending_moment
+from recipes.models import Favorite, RecipeEvent
+
+
+class TrendingTests(RecipeDataTestCase):
+    """Подборка популярных рецептов и ее валидаторы."""
+
+    URL = "/api/recipes/trending/"
+
+    def get_at(self, moment, **headers):
+        with mock.patch("core.trends.timezone.now", return_value=moment):
+            return self.client.get(self.URL, **headers)
+
+    def test_etag_changes_with_time(self):
+        """
+        В пределах интервала TRENDING_BUCKET ответ не меняется (304),
+        в следующем интервале ETag и Last-Modified другие.
+        """
+        moment = trending_moment()
+        response = self.get_at(moment)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        later = moment + timedelta(seconds=Limits.TRENDING_BUCKET - 1)
+        self.assertEqual(
+            self.get_at(later, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        next_bucket = moment + timedelta(seconds=Limits.TRENDING_BUCKET)
+        response = self.get_at(next_bucket, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(
+            response["Last-Modified"],
+            next_bucket.strftime("%a, %d %b %Y %H:%M:%S GMT"),
+        )
+
+    def test_trending_moment(self):
+        moment = timezone.now()
+        start = trending_moment(moment)
+        self.assertLessEqual(start, moment)
+        self.assertLess(
+            moment - start, timedelta(seconds=Limits.TRENDING_BUCKET)
+        )
+        self.assertEqual(trending_moment(start), start)
+
+
+class FavoriteAtomicTests(RecipeDataTestCase):
+    """Добавление в избранное и событие популярности - одна транзакция."""
+
+    def test_rollback(self):
+        recipe = self.recipes[1]
+        with mock.patch.object(
+            RecipeEvent.objects, "create", side_effect=RuntimeError
+        ), self.assertRaises(RuntimeError):
+            self.client.post(f"/api/recipes/{recipe.pk}/favorite/")
+        self.assertFalse(
+            Favorite.objects.filter(user=self.user, recipe=recipe).exists()
+        )
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 0)
@@ -2,15 +2,20 @@ from django.urls import include, path, re_path
 from rest_framework.routers import SimpleRouter
 
 from .views import (
+    CustomUserViewSet,
     IngredientViewSet,
+    PantryAPIView,
     RecipeViewSet,
     ShoppingCartAPIView,
     SubscribeAPIView,
     TagViewSet,
+    UserPantryAPIView,
+    UserShoppingListAPIView,
     UserSubscriptionAPIView,
 )
 
 router = SimpleRouter()
+router.register("users", CustomUserViewSet)
 router.register("ingredients", IngredientViewSet)
 router.register("tags", TagViewSet)
 router.register("recipes", RecipeViewSet)
@@ -26,12 +31,22 @@ urlpatterns = [
         UserSubscriptionAPIView.as_view(),
         name="subscriptions",
     ),
+    path("users/pantry/", UserPantryAPIView.as_view(), name="pantry"),
+    path(
+        "users/shopping_list/",
+        UserShoppingListAPIView.as_view(),
+        name="shopping_list",
+    ),
     re_path(
         r"^recipes/(?P<id>[^/.]+)/shopping_cart/$",
         ShoppingCartAPIView.as_view(),
         name="shopping_cart",
     ),
-    re_path("", include("djoser.urls")),
+    re_path(
+        r"^ingredients/(?P<id>[^/.]+)/pantry/$",
+        PantryAPIView.as_view(),
+        name="pantry_ingredient",
+    ),
     re_path(r"^auth/", include("djoser.urls.authtoken")),
     path("", include(router.urls)),
 ]
@@ -1,54 +1,183 @@
+import hashlib
+from datetime import datetime
+
 from django.contrib.auth import get_user_model
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import Func, IntegerField, OuterRef, Prefetch, Subquery
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import cached_property
+from django.views.decorators.http import condition
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, generics, status, views, viewsets
+from djoser.views import UserViewSet
+from rest_framework import generics, status, views, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from .filters import RecipeFilter
-from .pagination import PageLimitPagination
+from .filters import IngredientFilter, RecipeFilter, RecipeOrderingFilter
+from .pagination import PageLimitPagination, RecipeCursorPagination
 from .permissions import IsAuthenticatedCreateOrAuthorUpdateOrReadOnly
 from .serializers import (
     FavoriteSerializer,
     IngredientSerializer,
+    PantryIngredientSerializer,
     RecipeReadSerializer,
     RecipeWriteSerializer,
     ShoppingCartSerializer,
+    ShoppingListItemSerializer,
     SubscribeSerializer,
     SubscriptionSerializer,
     TagSerializer,
 )
-from core.constants import Messages
+from core.cache import (
+    CATALOG_VERSION,
+    FAVORITES_VERSION,
+    RECIPES_VERSION,
+    TRENDS_VERSION,
+    get_version,
+    user_version,
+)
+from core.constants import Limits, Messages
+from core.pantry import get_pantry_matrix
+from core.trends import min_log_score, trending_moment
 from core.utils import ShoppingList
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import Ingredient, Recipe, RecipeEvent, Tag
 
 User = get_user_model()
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Ingredient.objects.all()
+class ConditionalGetMixin:
+    """
+    Условные GET-запросы (ETag, Last-Modified) для list и retrieve.
+    Валидаторы вычисляются по версиям данных из кэша, поэтому ответ 304
+    формируется без обращения к базе данных и сериализаторам.
+    """
+
+    version_names: tuple = (CATALOG_VERSION,)
+    # Ответ содержит признаки текущего пользователя
+    personalized: bool = False
+
+    def get_version_names(self, request) -> list[str]:
+        return list(self.version_names)
+
+    def get_versions(self, request) -> list[int]:
+        if not hasattr(self, "_versions"):
+            names = self.get_version_names(request)
+            if self.personalized and request.user.is_authenticated:
+                names.append(user_version(request.user.pk))
+            self._versions = [get_version(name) for name in names]
+        return self._versions
+
+    def get_etag(self, request, *args, **kwargs) -> str:
+        key = "{}:{}:{}".format(
+            request.get_full_path(),
+            request.user.pk if self.personalized else "",
+            self.get_versions(request),
+        )
+        return hashlib.md5(key.encode()).hexdigest()
+
+    def get_last_modified(self, request, *args, **kwargs):
+        return datetime.fromtimestamp(
+            max(self.get_versions(request)) / 1_000_000, tz=timezone.utc
+        )
+
+    def conditional(self, handler, request, *args, **kwargs):
+        response = condition(
+            etag_func=self.get_etag, last_modified_func=self.get_last_modified
+        )(handler)(request, *args, **kwargs)
+        if self.personalized:
+            patch_vary_headers(response, ("Authorization",))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
+
+
+class CustomUserViewSet(UserViewSet):
+    """Представление пользователей с признаком подписки на них."""
+
+    def get_queryset(self):
+        return super().get_queryset().with_is_subscribed(self.request.user)
+
+
+class IngredientViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Ingredient.objects.select_related("unit")
     serializer_class = IngredientSerializer
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ("name",)
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = IngredientFilter
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        return self.conditional(self.get_list, request, *args, **kwargs)
+
+    def get_list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if request.query_params.get("name"):
+            queryset = queryset[: Limits.AUTOCOMPLETE_LIMIT]
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+
+class TagViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     serializer_class = RecipeReadSerializer
     pagination_class = PageLimitPagination
     permission_classes = (IsAuthenticatedCreateOrAuthorUpdateOrReadOnly,)
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (DjangoFilterBackend, RecipeOrderingFilter)
     filterset_class = RecipeFilter
+    ordering_fields = ("favorites_count",)
+    lookup_value_regex = r"\d+"
+    version_names = (CATALOG_VERSION, RECIPES_VERSION)
+    personalized = True
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if RecipeCursorPagination.is_requested(self.request):
+                self._paginator = RecipeCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_version_names(self, request) -> list[str]:
+        names = super().get_version_names(request)
+        if RecipeOrderingFilter.is_requested(request, "favorites_count"):
+            names.append(FAVORITES_VERSION)
+        if self.action == "trending":
+            names.append(TRENDS_VERSION)
+        return names
+
+    def get_versions(self, request) -> list[int]:
+        if not hasattr(self, "_versions"):
+            versions = super().get_versions(request)
+            if self.action == "trending":
+                # Подборка меняется и со временем, без изменения данных
+                versions.append(
+                    int(self.trending_moment.timestamp() * 1_000_000)
+                )
+        return self._versions
+
+    @cached_property
+    def trending_moment(self):
+        """Момент, на который вычисляется подборка популярных рецептов."""
+        return trending_moment()
+
+    def get_queryset(self):
+        return Recipe.objects.defer("search_vector").with_user_flags(
+            self.request.user
+        )
 
     def get_serializer_class(self):
         if self.request.method == "GET":
@@ -60,6 +189,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
         detail=True,
         permission_classes=(IsAuthenticated,),
     )
+    # Избранное, счетчик избранного и событие изменяются в одной транзакции
+    @transaction.atomic
     def favorite(self, request, pk):
         user = request.user
         recipe = get_object_or_404(Recipe, pk=pk)
@@ -70,6 +201,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
             )
             serializer.is_valid(raise_exception=True)
             serializer.save()
+            RecipeEvent.objects.create(
+                recipe=recipe, kind=RecipeEvent.FAVORITE
+            )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         if request.method == "DELETE":
@@ -84,19 +218,124 @@ class RecipeViewSet(viewsets.ModelViewSet):
             )
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
+    def get_limit(self, default: int, maximum: int) -> int:
+        """Возвращает количество рецептов в подборке из параметра limit."""
+        try:
+            limit = int(self.request.query_params["limit"])
+        except (KeyError, ValueError):
+            return default
+        return min(max(limit, 0), maximum)
+
     @action(
         methods=("get",),
         detail=False,
         permission_classes=(IsAuthenticated,),
     )
-    def download_shopping_cart(self, request):
-        user = request.user
-        filename = "recipedia_shopping_list_{}.txt".format(
-            timezone.now().date()
+    def pantry(self, request):
+        """
+        Рецепты с наибольшей долей ингредиентов, имеющихся у пользователя.
+        Доли считаются по матрице рецептов в памяти процесса, из базы
+        данных читаются только отобранные рецепты.
+        """
+        coverage = dict(
+            get_pantry_matrix().rank(
+                list(request.user.pantry.values_list("ingredient", flat=True)),
+                self.get_limit(
+                    Limits.PANTRY_RECIPES_LIMIT, Limits.PANTRY_RECIPES_MAX
+                ),
+            )
         )
-        shopping_list = ShoppingList.get_table(user)
-        response = HttpResponse(
-            shopping_list, content_type="text/plain; charset=utf-8"
+        recipes = self.get_queryset().in_bulk(coverage)
+        data = RecipeReadSerializer(
+            [recipes[pk] for pk in coverage if pk in recipes],
+            many=True,
+            context=self.get_serializer_context(),
+        ).data
+        for item in data:
+            item["pantry_coverage"] = coverage[item["id"]]
+        return Response(data)
+
+    def get_similar(self, request, pk):
+        recipes = (
+            self.get_queryset()
+            .filter(similar_to__recipe=pk)
+            .order_by("-similar_to__score")[: Limits.SIMILAR_RECIPES_LIMIT]
+        )
+        serializer = RecipeReadSerializer(
+            recipes, many=True, context=self.get_serializer_context()
+        )
+        return Response(serializer.data)
+
+    @action(methods=("get",), detail=True)
+    def similar(self, request, pk):
+        """
+        Похожие рецепты из таблицы, рассчитанной командой
+        build_similar_recipes, одним запросом по индексу.
+        """
+        # Без проверки для несуществующего рецепта возвращался бы пустой
+        # список, а не ответ 404
+        get_object_or_404(Recipe.objects.only("id"), pk=pk)
+        return self.conditional(self.get_similar, request, pk)
+
+    def get_trending(self, request):
+        limit = self.get_limit(Limits.TRENDING_LIMIT, Limits.TRENDING_MAX)
+        recipes = (
+            self.get_queryset()
+            .filter(trend__score__gte=min_log_score(self.trending_moment))
+            .order_by("-trend__score")[:limit]
+        )
+        serializer = RecipeReadSerializer(
+            recipes, many=True, context=self.get_serializer_context()
+        )
+        return Response(serializer.data)
+
+    @action(methods=("get",), detail=False)
+    def trending(self, request):
+        """
+        Рецепты, популярные за последние дни, по оценкам, рассчитанным
+        командой rollup_trends, одним запросом по индексу.
+        """
+        return self.conditional(self.get_trending, request)
+
+    @action(
+        methods=("get",),
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+    )
+    def download_shopping_cart(self, request):
+        """
+        Список покупок в формате file_format: txt (по умолчанию), csv
+        или pdf. PDF формируется в фоновом потоке: пока он не готов,
+        возвращается ответ 202 и запрос нужно повторить, а если его не
+        удалось сформировать - ответ 500.
+        """
+        file_format = request.query_params.get("file_format", "txt")
+        if file_format not in ShoppingList.CONTENT_TYPES:
+            return Response(
+                {"file_format": list(ShoppingList.CONTENT_TYPES)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        shopping_list = ShoppingList(request.user)
+        if file_format == "pdf":
+            content = shopping_list.get_pdf()
+            if content is None:
+                return Response(
+                    {"detail": Messages.SHOPPING_LIST_IN_PROGRESS},
+                    status=status.HTTP_202_ACCEPTED,
+                    headers={"Retry-After": "1"},
+                )
+            if content == ShoppingList.PDF_FAILED:
+                return Response(
+                    {"detail": Messages.SHOPPING_LIST_FAILED},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                )
+            response = HttpResponse(content)
+        else:
+            iter_content = getattr(shopping_list, f"iter_{file_format}")
+            response = StreamingHttpResponse(iter_content())
+        response["Content-Type"] = ShoppingList.CONTENT_TYPES[file_format]
+        filename = "recipedia_shopping_list_{}.{}".format(
+            timezone.now().date(), file_format
         )
         response["Content-Disposition"] = f"attachment; filename={filename}"
         return response
@@ -139,25 +378,68 @@ class UserSubscriptionAPIView(generics.ListAPIView):
     serializer_class = SubscriptionSerializer
     permission_classes = (IsAuthenticated,)
 
+    def get_recipes_limit(self) -> int:
+        """Возвращает ограничение количества рецептов каждого автора."""
+        try:
+            return max(int(self.request.query_params["recipes_limit"]), 0)
+        except (KeyError, ValueError):
+            return 0
+
     def get_queryset(self):
         user = self.request.user
-        return User.objects.filter(followers__user=user).prefetch_related(
-            "recipes"
+        recipes = Recipe.objects.all()
+        recipes_limit = self.get_recipes_limit()
+        if recipes_limit:
+            # первые recipes_limit рецептов каждого автора одним запросом
+            recipes = recipes.filter(
+                pk__in=Subquery(
+                    Recipe.objects.filter(author=OuterRef("author")).values(
+                        "pk"
+                    )[:recipes_limit]
+                )
+            )
+        return (
+            User.objects.filter(followers__user=user)
+            .with_is_subscribed(user)
+            # Количество рецептов считается подзапросом по автору, а не
+            # группировкой соединения подписок с рецептами
+            .annotate(
+                recipes_count=Subquery(
+                    Recipe.objects.filter(author=OuterRef("pk"))
+                    .order_by()
+                    .annotate(
+                        count=Func(
+                            "pk", function="COUNT", output_field=IntegerField()
+                        )
+                    )
+                    .values("count")
+                )
+            )
+            .order_by("id")
+            .prefetch_related(
+                Prefetch("recipes", queryset=recipes, to_attr="last_recipes")
+            )
         )
 
 
 class ShoppingCartAPIView(views.APIView):
     permission_classes = (IsAuthenticated,)
 
+    # Корзина и список покупок изменяются в одной транзакции
+    @transaction.atomic
     def post(self, request, id):
         data = {"user": request.user.id, "recipe": id}
         serializer = ShoppingCartSerializer(
             data=data, context={"request": request}
         )
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        shopping_cart = serializer.save()
+        RecipeEvent.objects.create(
+            recipe=shopping_cart.recipe, kind=RecipeEvent.SHOPPING_CART
+        )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @transaction.atomic
     def delete(self, request, id):
         user = request.user
         recipe = get_object_or_404(Recipe, id=id)
@@ -169,3 +451,57 @@ class ShoppingCartAPIView(views.APIView):
             {"errors": Messages.RECIPE_IS_NOT_IN_SHOPPING_CART},
             status=status.HTTP_400_BAD_REQUEST,
         )
+
+
+class PantryAPIView(views.APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, id):
+        data = {"user": request.user.id, "ingredient": id}
+        serializer = PantryIngredientSerializer(
+            data=data, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def delete(self, request, id):
+        user = request.user
+        ingredient = get_object_or_404(Ingredient, id=id)
+        pantry = user.pantry.filter(ingredient=ingredient)
+        if pantry.exists():
+            pantry.delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return Response(
+            {"errors": Messages.INGREDIENT_IS_NOT_IN_PANTRY},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+
+class UserPantryAPIView(generics.ListAPIView):
+    """Представление для вывода ингредиентов в наличии у пользователя."""
+
+    pagination_class = None
+    serializer_class = IngredientSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return Ingredient.objects.filter(
+            in_pantries__user=self.request.user
+        ).select_related("unit")
+
+
+class UserShoppingListAPIView(generics.ListAPIView):
+    """
+    Представление для вывода списка покупок текущего пользователя:
+    суммарных количеств ингредиентов рецептов в корзине.
+    """
+
+    pagination_class = None
+    serializer_class = ShoppingListItemSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return self.request.user.shopping_list.select_related(
+            "ingredient__unit"
+        ).order_by("ingredient__name")
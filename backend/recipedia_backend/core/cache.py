@@ -0,0 +1,181 @@
+import time
+from typing import Optional
+
+from django.core.cache import cache
+
+from core.constants import Limits
+
+# Наименования версий кэшируемых данных
+CATALOG_VERSION: str = "catalog"
+RECIPES_VERSION: str = "recipes"
+FAVORITES_VERSION: str = "favorites"
+TRENDS_VERSION: str = "trends"
+USER_VERSION: str = "user:{pk}"
+CART_VERSION: str = "cart:{pk}"
+RECIPE_VERSION: str = "recipe:{pk}"
+
+# Номер формата в ключе изменяется вместе с полями представления рецепта,
+# чтобы не читать из кэша представления в прежнем формате
+RECIPE_KEY: str = "recipe:3:{catalog}:{version}:{pk}"
+SHOPPING_LIST_KEY: str = "shopping_list:{kind}:{pk}:{version}"
+
+# Журнал изменений рецептов: счетчик записей и записи со списками pk
+RECIPE_CHANGES: str = "recipe_changes"
+RECIPE_CHANGE_KEY: str = "recipe_changes:{seq}"
+# Запись журнала об изменении всех рецептов
+ALL_RECIPES: str = "*"
+
+
+def _version_key(name: str) -> str:
+    return f"version:{name}"
+
+
+def get_version(name: str) -> int:
+    """
+    Возвращает текущую версию данных name.
+    Версия - время последнего изменения данных в микросекундах, поэтому
+    после вытеснения ключа из кэша она не возвращается к уже
+    использованному значению и может служить отметкой Last-Modified.
+    """
+    key = _version_key(name)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns() // 1000, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_versions(names) -> dict:
+    """
+    Возвращает текущие версии данных names {наименование: версия}
+    одним запросом к кэшу, если все версии в нем есть.
+    """
+    keys = {_version_key(name): name for name in names}
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        now = time.time_ns() // 1000
+        for key in missing:
+            cache.add(key, now, timeout=None)
+        versions.update(cache.get_many(missing))
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def bump_version(name: str) -> int:
+    """Обновляет версию данных name, делая устаревшими их копии в кэше."""
+    version = max(time.time_ns() // 1000, get_version(name) + 1)
+    cache.set(_version_key(name), version, timeout=None)
+    return version
+
+
+def bump_versions(names) -> None:
+    """Обновляет версии данных names одним запросом записи в кэш."""
+    now = time.time_ns() // 1000
+    cache.set_many(
+        {
+            _version_key(name): max(now, version + 1)
+            for name, version in get_versions(names).items()
+        },
+        timeout=None,
+    )
+
+
+def user_version(user_id: int) -> str:
+    """Наименование версии данных пользователя (избранное, корзина...)."""
+    return USER_VERSION.format(pk=user_id)
+
+
+def cart_version(user_id: int) -> str:
+    """Наименование версии корзины покупок пользователя."""
+    return CART_VERSION.format(pk=user_id)
+
+
+def bump_cart_versions(user_ids) -> None:
+    """Обновляет версии корзин покупок пользователей user_ids."""
+    for user_id in user_ids:
+        bump_version(cart_version(user_id))
+
+
+def recipe_version(pk: int) -> str:
+    """Наименование версии данных рецепта."""
+    return RECIPE_VERSION.format(pk=pk)
+
+
+def recipe_cache_keys(pks) -> dict:
+    """
+    Ключи кэша общей для всех пользователей части представления рецептов
+    {pk: ключ}. Ключ включает версию справочников и версию рецепта.
+    """
+    catalog = get_version(CATALOG_VERSION)
+    versions = get_versions(recipe_version(pk) for pk in pks)
+    return {
+        pk: RECIPE_KEY.format(
+            catalog=catalog, version=versions[recipe_version(pk)], pk=pk
+        )
+        for pk in pks
+    }
+
+
+def get_recipe_representations(recipes, build) -> dict:
+    """
+    Возвращает словарь {pk: представление} для рецептов recipes.
+    Отсутствующие в кэше представления строятся функцией build(recipes)
+    и сохраняются в кэш.
+    Версии читаются до построения представлений, поэтому представление,
+    построенное по данным до изменения рецепта, сохраняется под прежней
+    версией и после invalidate_recipes не читается.
+    """
+    keys = recipe_cache_keys([recipe.pk for recipe in recipes])
+    cached = cache.get_many(keys.values())
+    missing = [recipe for recipe in recipes if keys[recipe.pk] not in cached]
+    if missing:
+        built = {keys[pk]: data for pk, data in build(missing).items()}
+        cache.set_many(built, Limits.RECIPE_CACHE_TIMEOUT)
+        cached.update(built)
+    return {recipe.pk: cached[keys[recipe.pk]] for recipe in recipes}
+
+
+def invalidate_recipes(pks) -> None:
+    """Делает устаревшими представления рецептов с первичными ключами pks."""
+    pks = list(pks)
+    bump_versions(recipe_version(pk) for pk in pks)
+    bump_version(RECIPES_VERSION)
+    log_recipe_changes(pks)
+
+
+def log_recipe_changes(pks=None) -> None:
+    """
+    Добавляет в журнал изменений запись об изменении рецептов pks
+    (pks=None - изменены все рецепты).
+    Номер первой записи берется от текущего времени, как у версий,
+    поэтому после вытеснения счетчика из кэша новые номера не совпадут
+    с уже прочитанными.
+    """
+    get_version(RECIPE_CHANGES)
+    try:
+        seq = cache.incr(_version_key(RECIPE_CHANGES))
+    except ValueError:
+        # Счетчик вытеснен: читатели журнала перестроят данные полностью
+        return
+    cache.set(
+        RECIPE_CHANGE_KEY.format(seq=seq),
+        ALL_RECIPES if pks is None else list(pks),
+        Limits.RECIPE_CHANGES_TIMEOUT,
+    )
+
+
+def get_recipe_changes(since: Optional[int]) -> tuple[int, Optional[set]]:
+    """
+    Возвращает номер последней записи журнала изменений рецептов и
+    множество pk рецептов, измененных после записи since.
+    Вместо множества возвращается None, если журнал после since неполон
+    (записи вытеснены или их слишком много) и данные нужно перестроить.
+    """
+    seq = get_version(RECIPE_CHANGES)
+    if since is None or not 0 <= seq - since <= Limits.RECIPE_CHANGES_MAX:
+        return seq, None
+    keys = [RECIPE_CHANGE_KEY.format(seq=n) for n in range(since + 1, seq + 1)]
+    entries = cache.get_many(keys)
+    if len(entries) < len(keys) or ALL_RECIPES in entries.values():
+        return seq, None
+    return seq, set().union(*entries.values())
@@ -0,0 +1,40 @@
+import threading
+
+from core.cache import CATALOG_VERSION, get_version
+from recipes.models import Ingredient, Tag
+
+
+class Catalog:
+    """
+    Справочники тэгов, единиц измерения и ингредиентов в памяти процесса.
+    Объекты справочников общие для всех запросов и не должны изменяться.
+    """
+
+    def __init__(self, version: int):
+        self.version = version
+        self.tags = {tag.pk: tag for tag in Tag.objects.all()}
+        self.tags_by_slug = {tag.slug: tag for tag in self.tags.values()}
+        self.ingredients = {
+            ingredient.pk: ingredient
+            for ingredient in Ingredient.objects.select_related("unit")
+        }
+
+
+_catalog = None
+_lock = threading.Lock()
+
+
+def get_catalog() -> Catalog:
+    """
+    Возвращает каталог справочников, перечитывая его из базы данных,
+    если общая для всех процессов версия каталога изменилась.
+    """
+    global _catalog
+    version = get_version(CATALOG_VERSION)
+    catalog = _catalog
+    if catalog is None or catalog.version != version:
+        with _lock:
+            if _catalog is None or _catalog.version != version:
+                _catalog = Catalog(version)
+            catalog = _catalog
+    return catalog
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core import checks
+
+from core.constants import Messages
+
+# Кэши, не общие для процессов сервера и команд управления
+LOCAL_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Кэш хранит версии данных, по которым строятся ETag и сбрасываются
+    копии данных, поэтому он должен быть общим для процессов, если
+    settings.CACHE_LOCAL_ALLOWED (DEBUG) не разрешает кэш в памяти.
+    """
+    backend = settings.CACHES["default"]["BACKEND"]
+    if settings.CACHE_LOCAL_ALLOWED or backend not in LOCAL_CACHE_BACKENDS:
+        return []
+    return [
+        checks.Error(
+            Messages.CACHE_NOT_SHARED.format(backend),
+            hint=Messages.CACHE_NOT_SHARED_HINT,
+            id="core.E001",
+        )
+    ]
@@ -17,6 +17,29 @@ class Messages:
     LOAD_TABLE: Final = "Загрузка таблицы {}"
     LOAD_FINISHED: Final = "Загрузка завершена. Загружено {} записей"
     TABLE_UPDATE_FINISHED: Final = "Обновление таблицы завершено."
+    SIMILAR_RECIPES_PROGRESS: Final = "Рассчитаны похожие рецепты: {} из {}"
+    TRENDS_PROGRESS: Final = "Обработано событий: {}"
+    IMAGE_VARIANTS_PROGRESS: Final = (
+        "Проверено картинок рецептов: {}, создано вариантов: {}"
+    )
+    MEDIA_GC_UNUSED: Final = "Неиспользуемый файл: {}"
+    MEDIA_GC_STORAGE: Final = (
+        "Поддерживается только файловое хранилище FileSystemStorage, "
+        "а не {}."
+    )
+    MEDIA_GC_PROGRESS: Final = (
+        "Проверено файлов: {}, неиспользуемых старше отсрочки: {}"
+    )
+    IMAGE_VARIANTS_FAILED: Final = "Рецепт {}: не удалось создать варианты: {}"
+    SHOPPING_LIST_MISMATCH: Final = (
+        "Пользователь {}, ингредиент {}: сохранено {}, по корзине {}"
+    )
+    SHOPPING_LIST_CHECKED: Final = (
+        "Проверено списков покупок: {}, расхождений: {}"
+    )
+    FAVORITES_COUNT_PROGRESS: Final = (
+        "Проверено рецептов: {}, исправлено счетчиков избранного: {}"
+    )
     MESSAGE_INGREDIENT: Final = "{}, {}"
     TABLE_IS_NOT_EMPTY: Final = (
         "Таблица {} не пустая!\n"
@@ -29,6 +52,30 @@ class Messages:
     REPETITIVE_TAGS: Final = "Повторяющиеся тэги в рецепте!"
     REPETITIVE_INGREDIENTS: Final = "Повторяющиеся ингредиенты в рецепте!"
     NO_TAGS: Final = "Отсутствует поле tags!"
+    TAGS_DO_NOT_EXIST: Final = "Тэги не существуют: {}."
+    INGREDIENTS_DO_NOT_EXIST: Final = "Ингредиенты не существуют: {}."
+    SHOPPING_LIST_IN_PROGRESS: Final = (
+        "Список покупок формируется, повторите запрос позже."
+    )
+    SHOPPING_LIST_FAILED: Final = (
+        "Не удалось сформировать список покупок, повторите запрос позже."
+    )
+    IMAGE_TOO_LARGE: Final = "Размер файла картинки больше {} МБ."
+    IMAGE_TOO_MANY_PIXELS: Final = "Картинка больше {} пикселей."
+    INGREDIENT_ALREADY_IN_PANTRY: Final = "Ингредиент уже есть в наличии!"
+    INGREDIENT_IS_NOT_IN_PANTRY: Final = "Ингредиента нет в наличии!"
+    CACHE_NOT_SHARED: Final = (
+        "Кэш {} не является общим для процессов сервера и команд "
+        "управления и допустим только при DEBUG=True."
+    )
+    CACHE_NOT_SHARED_HINT: Final = (
+        "Укажите в CACHES['default'] общий кэш, например "
+        "django.core.cache.backends.memcached.PyMemcacheCache "
+        "(переменные окружения CACHE_BACKEND и CACHE_LOCATION)."
+    )
+    ORDERING_WITH_CURSOR: Final = (
+        "Курсорная пагинация не поддерживает параметр ordering."
+    )
 
 
 class Limits:
@@ -50,3 +97,61 @@ class Limits:
     AMOUNT_MAX: int = 32_000
     COOKING_TIME_MIN: int = 1
     COOKING_TIME_MAX: int = 32_000
+    # Подсчет записей при пагинации
+    COUNT_CACHE_TIMEOUT: int = 60
+    COUNT_ESTIMATE_THRESHOLD: int = 10_000
+    # Время хранения представления рецепта в кэше, с
+    RECIPE_CACHE_TIMEOUT: int = 60 * 60 * 24
+    # Время хранения списка покупок в кэше, с
+    SHOPPING_LIST_CACHE_TIMEOUT: int = 60 * 60 * 24
+    # Время, в течение которого не повторяется неудавшееся формирование
+    # списка покупок в PDF, с
+    SHOPPING_LIST_FAILURE_TIMEOUT: int = 60
+    # Максимальное количество подсказок при поиске ингредиентов
+    AUTOCOMPLETE_LIMIT: int = 20
+    # Журнал изменений рецептов: время хранения записи, с, и максимальное
+    # количество записей, применяемых без полного перестроения данных
+    RECIPE_CHANGES_TIMEOUT: int = 60 * 60
+    RECIPE_CHANGES_MAX: int = 1000
+    # Количество рецептов в подборке по ингредиентам в наличии
+    PANTRY_RECIPES_LIMIT: int = 10
+    PANTRY_RECIPES_MAX: int = 100
+    # Количество сохраняемых похожих рецептов и размер пакета рецептов
+    # при их расчете
+    SIMILAR_RECIPES_LIMIT: int = 12
+    SIMILAR_RECIPES_BATCH_SIZE: int = 200
+    # Размер пакета рецептов при пересчете счетчиков избранного
+    FAVORITES_COUNT_BATCH_SIZE: int = 1000
+    # Популярность с затуханием: время уменьшения веса события вдвое, с,
+    # минимальная популярность рецепта в подборке (в весах событий),
+    # количество рецептов в подборке и размер пакета событий
+    TRENDING_HALF_LIFE: int = 60 * 60 * 24 * 2
+    TRENDING_MIN_SCORE: float = 0.1
+    TRENDING_LIMIT: int = 10
+    TRENDING_MAX: int = 100
+    # Интервал, в течение которого подборка популярных рецептов не
+    # меняется без новых оценок, с
+    TRENDING_BUCKET: int = 60 * 10
+    TRENDING_BATCH_SIZE: int = 5000
+    # Картинка рецепта: максимальный размер файла, байт, и количество
+    # пикселей, размер части строки base64 при декодировании, символов
+    IMAGE_MAX_SIZE: int = 10 * 1024 * 1024
+    IMAGE_MAX_PIXELS: int = 40_000_000
+    IMAGE_DECODE_CHUNK_SIZE: int = 64 * 1024
+    # Уменьшенные копии картинки: размер карточки (картинка обрезается
+    # до него), наибольший размер для страницы рецепта, пикселей,
+    # и качество сжатия JPEG и WebP
+    IMAGE_CARD_SIZE: tuple = (480, 320)
+    IMAGE_DETAIL_SIZE: tuple = (1280, 1280)
+    IMAGE_VARIANT_QUALITY: int = 80
+    # Размер пакета рецептов при создании вариантов картинок
+    IMAGE_VARIANTS_BATCH_SIZE: int = 100
+    # Сборка мусора в медиафайлах: время, в течение которого новый или
+    # повторно использованный файл не удаляется, с, и размер пакета
+    # файлов, проверяемых одним запросом
+    MEDIA_GC_GRACE_PERIOD: int = 60 * 60 * 24
+    MEDIA_GC_BATCH_SIZE: int = 1000
+    # Размер пакета пользователей при проверке списков покупок
+    SHOPPING_LIST_BATCH_SIZE: int = 500
+    # Размер пакета рецептов при пересчете индекса ингредиентов
+    INGREDIENT_IDS_BATCH_SIZE: int = 1000
@@ -0,0 +1,135 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from core.cache import invalidate_recipes
+from core.constants import Limits
+from core.storage import touch
+from core.tasks import submit_once
+from recipes.models import Recipe
+
+# Варианты картинки: имя -> (размер, обрезать ли картинку до размера)
+VARIANTS = {
+    "card": (Limits.IMAGE_CARD_SIZE, True),
+    "detail": (Limits.IMAGE_DETAIL_SIZE, False),
+}
+# Форматы файлов вариантов: суффикс имени варианта -> (формат, расширение)
+FORMATS = {"": ("JPEG", "jpg"), "_webp": ("WEBP", "webp")}
+VARIANT_KEYS = tuple(
+    variant + suffix for variant in VARIANTS for suffix in FORMATS
+)
+VARIANTS_DIR = "recipes/variants/"
+
+
+def has_current_variants(recipe: Recipe) -> bool:
+    """Проверяет, созданы ли варианты по текущей картинке рецепта."""
+    return bool(recipe.image) and (
+        recipe.image_variants.get("source") == recipe.image.name
+    )
+
+
+def variant_names(image_name: str) -> dict:
+    """
+    Имена файлов вариантов картинки image_name: {вариант: имя}. Имена
+    зависят только от имени картинки, поэтому для картинок, хранимых по
+    хэшу содержимого, одинаковые картинки имеют общие варианты.
+    """
+    base = os.path.basename(image_name).replace(".", "_")
+    return {
+        variant + suffix: f"{VARIANTS_DIR}{base[:2]}/{base}_{variant}.{ext}"
+        for variant in VARIANTS
+        for suffix, (_, ext) in FORMATS.items()
+    }
+
+
+def render_variants(image_name: str) -> dict:
+    """
+    Создает в хранилище уменьшенные копии картинки image_name во всех
+    форматах, которых еще нет, и возвращает {"source": image_name,
+    вариант: имя файла}.
+    """
+    names = variant_names(image_name)
+    variants = {"source": image_name, **names}
+    missing = [
+        variant
+        for variant, name in names.items()
+        if not touch(default_storage, name)
+    ]
+    if not missing:
+        return variants
+    with default_storage.open(image_name) as file, Image.open(file) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        for variant, (size, crop) in VARIANTS.items():
+            if crop:
+                resized = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+            else:
+                resized = image.copy()
+                resized.thumbnail(size, Image.Resampling.LANCZOS)
+            for suffix, (image_format, _) in FORMATS.items():
+                if variant + suffix not in missing:
+                    continue
+                buffer = BytesIO()
+                resized.save(
+                    buffer, image_format, quality=Limits.IMAGE_VARIANT_QUALITY
+                )
+                variants[variant + suffix] = default_storage.save(
+                    names[variant + suffix], ContentFile(buffer.getvalue())
+                )
+    return variants
+
+
+def build_image_variants(recipe_id: int) -> bool:
+    """
+    Создает варианты картинки рецепта, если они не соответствуют
+    текущей картинке. Возвращает True, если варианты сохранены.
+    """
+    recipe = (
+        Recipe.objects.filter(pk=recipe_id)
+        .only("image", "image_variants")
+        .first()
+    )
+    if recipe is None or not recipe.image or has_current_variants(recipe):
+        return False
+    variants = render_variants(recipe.image.name)
+    # Картинку могли заменить, пока создавались варианты. Файлы
+    # вариантов могут быть общими с другими рецептами, поэтому
+    # неиспользуемые удаляет команда gc_media
+    if not Recipe.objects.filter(pk=recipe_id, image=recipe.image.name).update(
+        image_variants=variants
+    ):
+        return False
+    invalidate_recipes([recipe_id])
+    return True
+
+
+def schedule_image_variants(recipe: Recipe) -> None:
+    """
+    После фиксации транзакции ставит создание вариантов картинки
+    рецепта в очередь фоновых задач.
+    """
+    if not recipe.image or has_current_variants(recipe):
+        return
+    recipe_id = recipe.pk
+    transaction.on_commit(
+        lambda: submit_once(
+            f"image_variants:{recipe_id}", build_image_variants, recipe_id
+        )
+    )
+
+
+def get_variant_urls(recipe: Recipe) -> dict:
+    """
+    Возвращает {вариант: URL} для вариантов текущей картинки рецепта
+    или пустой словарь, пока варианты не созданы.
+    """
+    if not has_current_variants(recipe):
+        return {}
+    return {
+        variant: default_storage.url(name)
+        for variant, name in recipe.image_variants.items()
+        if variant != "source"
+    }
@@ -0,0 +1,49 @@
+from django.core.management import BaseCommand
+
+from core.constants import Limits, Messages
+from core.images import build_image_variants, has_current_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Создание уменьшенных копий картинок рецептов, у которых их нет"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=Limits.IMAGE_VARIANTS_BATCH_SIZE,
+            help="Количество рецептов в пакете",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        checked = built = 0
+        last_pk = 0
+        while True:
+            recipes = list(
+                Recipe.objects.filter(pk__gt=last_pk)
+                .exclude(image="")
+                .exclude(image=None)
+                .order_by("pk")
+                .only("image", "image_variants")[:batch_size]
+            )
+            if not recipes:
+                break
+            last_pk = recipes[-1].pk
+            for recipe in recipes:
+                if has_current_variants(recipe):
+                    continue
+                try:
+                    built += build_image_variants(recipe.pk)
+                except OSError as error:
+                    print(
+                        self.style.WARNING(
+                            Messages.IMAGE_VARIANTS_FAILED.format(
+                                recipe.pk, error
+                            )
+                        )
+                    )
+            checked += len(recipes)
+            print(Messages.IMAGE_VARIANTS_PROGRESS.format(checked, built))
+        print(self.style.SUCCESS(Messages.TABLE_UPDATE_FINISHED))
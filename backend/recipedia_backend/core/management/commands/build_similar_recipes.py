@@ -0,0 +1,126 @@
+import numpy as np
+from django.core.management import BaseCommand
+from django.db import transaction
+from scipy import sparse
+
+from core.cache import RECIPES_VERSION, bump_version
+from core.constants import Limits, Messages
+from recipes.models import Favorite, Recipe, ShoppingCart, SimilarRecipe
+
+# Веса составляющих оценки сходства рецептов
+INTERACTIONS_WEIGHT = 0.6
+INGREDIENTS_WEIGHT = 0.3
+TAGS_WEIGHT = 0.1
+
+
+def cosine_matrix(pairs, recipe_ids):
+    """
+    Бинарная разреженная матрица признаки x рецепты по парам
+    (id признака, pk рецепта) с нормированными столбцами: произведение
+    столбцов дает косинусное сходство рецептов.
+    """
+    pairs = np.array(list(pairs), dtype=np.int64).reshape(-1, 2)
+    features, recipes = pairs[:, 0], pairs[:, 1]
+    known = np.isin(recipes, recipe_ids)
+    features = features[known]
+    columns = np.searchsorted(recipe_ids, recipes[known])
+    matrix = sparse.csc_matrix(
+        (np.ones(len(features)), (features, columns)),
+        shape=(features.max(initial=0) + 1, len(recipe_ids)),
+    )
+    # Повторяющиеся пары суммируются, признак учитываем один раз
+    matrix.data[:] = 1
+    norms = np.sqrt(np.diff(matrix.indptr))
+    norms[norms == 0] = 1
+    return (matrix @ sparse.diags(1 / norms)).tocsc()
+
+
+class Command(BaseCommand):
+    help = (
+        "Расчет похожих рецептов по совместному добавлению в избранное и "
+        "корзину покупок, общим ингредиентам и тэгам"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=Limits.SIMILAR_RECIPES_BATCH_SIZE,
+            help="Количество рецептов в пакете",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=Limits.SIMILAR_RECIPES_LIMIT,
+            help="Количество похожих рецептов для каждого рецепта",
+        )
+
+    def get_matrices(self, recipe_ids):
+        """Возвращает пары (вес, матрица признаки x рецепты)."""
+        interactions = list(
+            Favorite.objects.values_list("user", "recipe")
+        ) + list(ShoppingCart.objects.values_list("user", "recipe"))
+        ingredients = (
+            (ingredient, pk)
+            for pk, ingredient_ids in Recipe.objects.values_list(
+                "pk", "ingredient_ids"
+            )
+            for ingredient in ingredient_ids
+        )
+        tags = Recipe.tags.through.objects.values_list("tag", "recipe")
+        return (
+            (INTERACTIONS_WEIGHT, cosine_matrix(interactions, recipe_ids)),
+            (INGREDIENTS_WEIGHT, cosine_matrix(ingredients, recipe_ids)),
+            (TAGS_WEIGHT, cosine_matrix(tags, recipe_ids)),
+        )
+
+    def get_similar(self, scores, recipe_ids, start, limit):
+        """
+        Возвращает похожие рецепты по строкам оценок сходства scores
+        рецептов recipe_ids[start:start + len(scores)].
+        """
+        similar = []
+        for row in range(scores.shape[0]):
+            begin, end = scores.indptr[row], scores.indptr[row + 1]
+            columns = scores.indices[begin:end]
+            values = scores.data[begin:end]
+            own = columns != start + row
+            columns, values = columns[own], values[own]
+            if len(values) > limit:
+                top = np.argpartition(-values, limit - 1)[:limit]
+                columns, values = columns[top], values[top]
+            for column, value in zip(columns.tolist(), values.tolist()):
+                similar.append(
+                    SimilarRecipe(
+                        recipe_id=int(recipe_ids[start + row]),
+                        similar_id=int(recipe_ids[column]),
+                        score=value,
+                    )
+                )
+        return similar
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        limit = options["limit"]
+        recipe_ids = np.array(
+            Recipe.objects.order_by("pk").values_list("pk", flat=True),
+            dtype=np.int64,
+        )
+        matrices = self.get_matrices(recipe_ids)
+        for start in range(0, len(recipe_ids), batch_size):
+            stop = min(start + batch_size, len(recipe_ids))
+            scores = sum(
+                weight * (matrix[:, start:stop].T @ matrix).tocsr()
+                for weight, matrix in matrices
+            ).tocsr()
+            similar = self.get_similar(scores, recipe_ids, start, limit)
+            with transaction.atomic():
+                SimilarRecipe.objects.filter(
+                    recipe_id__in=recipe_ids[start:stop].tolist()
+                ).delete()
+                SimilarRecipe.objects.bulk_create(similar)
+            print(
+                Messages.SIMILAR_RECIPES_PROGRESS.format(stop, len(recipe_ids))
+            )
+        bump_version(RECIPES_VERSION)
+        print(self.style.SUCCESS(Messages.TABLE_UPDATE_FINISHED))
@@ -19,6 +19,9 @@ TABLE_NAMES = (
     "shoppingcart",
 )
 
+# Поля, вычисляемые базой данных или importdb по другим таблицам
+DERIVED_FIELDS = {"search_vector", "ingredient_ids", "image_variants"}
+
 
 class Command(BaseCommand):
     help = "Экспорт данных из базы данных"
@@ -33,7 +36,11 @@ class Command(BaseCommand):
     def export_csv(self, model, file_name):
         opts = model._meta
 
-        field_names = [field.name for field in opts.fields]
+        field_names = [
+            field.name
+            for field in opts.fields
+            if field.name not in DERIVED_FIELDS
+        ]
         # Write a first row with header information
         with open(file_name, mode="w", encoding="utf-8") as csv_file:
             writer = csv.writer(
@@ -0,0 +1,175 @@
+import os
+import time
+from itertools import islice
+
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management import BaseCommand, CommandError
+from django.db.models import Q
+
+from core.constants import Limits, Messages
+from core.images import VARIANT_KEYS, VARIANTS_DIR
+from recipes.models import Recipe
+
+# Каталог хранилища, в который файлы переносятся перед удалением
+TRASH_DIR = "gc_trash/"
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаление картинок рецептов и их вариантов, на которые не "
+        "ссылается ни один рецепт. Поддерживается только файловое "
+        "хранилище (FileSystemStorage)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-period",
+            type=int,
+            default=Limits.MEDIA_GC_GRACE_PERIOD,
+            help="Не удалять файлы, измененные за это количество секунд",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=Limits.MEDIA_GC_BATCH_SIZE,
+            help="Количество файлов в пакете",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только вывести неиспользуемые файлы, не удаляя их",
+        )
+
+    def iter_files(self, directory: str):
+        """
+        Обходит каталог хранилища без построения полного списка файлов
+        и возвращает имена файлов с временем их изменения.
+        """
+        root = default_storage.path(directory)
+        if not os.path.isdir(root):
+            return
+        stack = [root]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        name = os.path.relpath(
+                            entry.path, default_storage.location
+                        )
+                        yield (
+                            name.replace(os.sep, "/"),
+                            entry.stat().st_mtime,
+                        )
+
+    def get_referenced(self, names: list) -> set:
+        """
+        Имена файлов из names, на которые ссылаются рецепты: картинки
+        и варианты текущих картинок.
+        """
+        referenced = set(
+            Recipe.objects.filter(image__in=names).values_list(
+                "image", flat=True
+            )
+        )
+        variants_filter = Q()
+        for key in VARIANT_KEYS:
+            variants_filter |= Q(**{f"image_variants__{key}__in": names})
+        # Варианты прежней картинки рецепта не используются, даже если
+        # новые варианты еще не созданы
+        for image, variants in Recipe.objects.filter(
+            variants_filter
+        ).values_list("image", "image_variants"):
+            if variants.get("source") == image:
+                referenced.update(variants.values())
+        return referenced
+
+    def trash_path(self, name: str) -> str:
+        return default_storage.path(TRASH_DIR + name)
+
+    def restore(self, name: str) -> None:
+        """
+        Возвращает файл name из корзины. Если файл с этим именем уже
+        записан заново, копия из корзины удаляется: имена файлов
+        зависят от их содержимого.
+        """
+        path = default_storage.path(name)
+        if os.path.exists(path):
+            os.remove(self.trash_path(name))
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(self.trash_path(name), path)
+
+    def restore_trash(self) -> None:
+        """Возвращает файлы, оставшиеся в корзине после прерванного запуска."""
+        for name, _ in list(self.iter_files(TRASH_DIR)):
+            self.restore(name.removeprefix(TRASH_DIR))
+
+    def remove(self, name: str, cutoff: float) -> bool:
+        """
+        Удаляет неиспользуемый файл name и возвращает True, если он удален.
+        Файл сначала переносится в корзину: после этого core.storage.touch
+        его не находит, и повторно используемый файл записывается заново.
+        Затем проверяется, не использован ли файл до переноса (время
+        изменения и ссылки рецептов); используемый файл возвращается.
+        """
+        trash = self.trash_path(name)
+        os.makedirs(os.path.dirname(trash), exist_ok=True)
+        try:
+            os.replace(default_storage.path(name), trash)
+        except FileNotFoundError:
+            return False
+        if os.path.getmtime(trash) >= cutoff or self.get_referenced([name]):
+            self.restore(name)
+            return False
+        os.remove(trash)
+        return True
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, FileSystemStorage):
+            raise CommandError(
+                Messages.MEDIA_GC_STORAGE.format(
+                    default_storage.__class__.__name__
+                )
+            )
+        if not options["dry_run"]:
+            self.restore_trash()
+        batch_size = options["batch_size"]
+        cutoff = time.time() - options["grace_period"]
+        upload_to = Recipe._meta.get_field("image").upload_to
+        checked = unused = 0
+        for directory in (upload_to, VARIANTS_DIR):
+            files = (
+                name
+                for name, modified in self.iter_files(directory)
+                if modified < cutoff
+            )
+            while True:
+                batch = list(islice(files, batch_size))
+                if not batch:
+                    break
+                referenced = self.get_referenced(batch)
+                for name in batch:
+                    if name in referenced:
+                        continue
+                    if options["dry_run"]:
+                        # Файл мог быть повторно использован после
+                        # проверки времени изменения при обходе каталога
+                        try:
+                            path = default_storage.path(name)
+                            if os.path.getmtime(path) >= cutoff:
+                                continue
+                        except FileNotFoundError:
+                            continue
+                    elif not self.remove(name, cutoff):
+                        continue
+                    unused += 1
+                    print(Messages.MEDIA_GC_UNUSED.format(name))
+                checked += len(batch)
+                print(Messages.MEDIA_GC_PROGRESS.format(checked, unused))
+        print(
+            self.style.SUCCESS(
+                Messages.MEDIA_GC_PROGRESS.format(checked, unused)
+            )
+        )
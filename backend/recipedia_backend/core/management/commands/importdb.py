@@ -6,12 +6,21 @@ from django.contrib.auth import get_user_model
 from django.core.management import BaseCommand
 from django.shortcuts import get_object_or_404
 
+from core.cache import (
+    CATALOG_VERSION,
+    RECIPES_VERSION,
+    bump_cart_versions,
+    bump_version,
+    log_recipe_changes,
+)
+from core.constants import Limits
 from recipes.models import (
     Favorite,
     Ingredient,
     Recipe,
     RecipeIngredient,
     ShoppingCart,
+    ShoppingListItem,
     Subscription,
     Tag,
     Unit,
@@ -123,3 +132,20 @@ class Command(BaseCommand):
                     MESSAGE_IMPORT_FINISHED.format(records_loaded)
                 )
             )
+        # bulk_create не отправляет сигналы: обновляем производные данные
+        recipe_ids = list(Recipe.objects.values_list("pk", flat=True))
+        batch_size = Limits.INGREDIENT_IDS_BATCH_SIZE
+        for start in range(0, len(recipe_ids), batch_size):
+            Recipe.objects.filter(
+                pk__in=recipe_ids[start:start + batch_size]
+            ).update_ingredient_ids()
+        user_ids = ShoppingListItem.objects.owner_ids()
+        batch_size = Limits.SHOPPING_LIST_BATCH_SIZE
+        for start in range(0, len(user_ids), batch_size):
+            mismatches = ShoppingListItem.objects.reconcile(
+                user_ids[start:start + batch_size]
+            )
+            bump_cart_versions({user for user, _ in mismatches})
+        bump_version(CATALOG_VERSION)
+        bump_version(RECIPES_VERSION)
+        log_recipe_changes()
@@ -4,6 +4,7 @@ import os
 from django.core.management import BaseCommand
 from recipedia_backend.settings import INITIAL_DATA_DIR
 
+from core.cache import CATALOG_VERSION, bump_version
 from recipes.models import Tag
 
 ALREADY_LOADED_MESSAGE: str = """
@@ -50,4 +51,5 @@ class Command(BaseCommand):
                     MESSAGE_LOAD_FINISHED.format(records_loaded)
                 )
             )
+        bump_version(CATALOG_VERSION)
         print(self.style.SUCCESS(MESSAGE_TABLE_UPDATE_FINISHED))
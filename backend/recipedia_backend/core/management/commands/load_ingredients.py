@@ -2,6 +2,7 @@ from csv import DictReader
 
 from django.core.management import BaseCommand
 
+from core.cache import CATALOG_VERSION, bump_version
 from core.constants import Messages
 from recipes.models import Ingredient, Unit
 
@@ -50,4 +51,5 @@ class Command(BaseCommand):
                 )
             )
             Ingredient.objects.bulk_create(ingredients)
+            bump_version(CATALOG_VERSION)
             print(self.style.SUCCESS(Messages.TABLE_UPDATE_FINISHED))
@@ -2,6 +2,7 @@ from csv import DictReader
 
 from django.core.management import BaseCommand
 
+from core.cache import CATALOG_VERSION, bump_version
 from core.constants import Messages
 from recipes.models import Tag
 
@@ -43,4 +44,5 @@ class Command(BaseCommand):
                 )
             )
             Tag.objects.bulk_create(tags)
+            bump_version(CATALOG_VERSION)
             print(self.style.SUCCESS(Messages.TABLE_UPDATE_FINISHED))
@@ -0,0 +1,55 @@
+from django.core.management import BaseCommand
+from django.db.models import Count, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from core.cache import FAVORITES_VERSION, bump_version
+from core.constants import Limits, Messages
+from recipes.models import Favorite, Recipe
+
+
+class Command(BaseCommand):
+    help = "Пересчет счетчиков избранного рецептов по таблице Favorite"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=Limits.FAVORITES_COUNT_BATCH_SIZE,
+            help="Количество рецептов в пакете",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        actual = Coalesce(
+            Subquery(
+                Favorite.objects.filter(recipe=OuterRef("pk"))
+                .order_by()
+                .values("recipe")
+                .annotate(count=Count("pk"))
+                .values("count")
+            ),
+            Value(0),
+        )
+        checked = fixed = 0
+        last_pk = 0
+        while True:
+            pks = list(
+                Recipe.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            last_pk = pks[-1]
+            # Значение вычисляется в том же UPDATE, поэтому изменения
+            # избранного во время пересчета не теряются
+            fixed += (
+                Recipe.objects.filter(pk__in=pks)
+                .filter(~Q(favorites_count=actual))
+                .update(favorites_count=actual)
+            )
+            checked += len(pks)
+            print(Messages.FAVORITES_COUNT_PROGRESS.format(checked, fixed))
+        if fixed:
+            bump_version(FAVORITES_VERSION)
+        print(self.style.SUCCESS(Messages.TABLE_UPDATE_FINISHED))
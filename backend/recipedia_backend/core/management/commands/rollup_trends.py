@@ -0,0 +1,66 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from core.cache import TRENDS_VERSION, bump_version
+from core.constants import Limits, Messages
+from core.trends import EVENT_WEIGHTS, add_log_scores, log_score, min_log_score
+from recipes.models import RecipeEvent, RecipeTrend
+
+
+class Command(BaseCommand):
+    help = (
+        "Обновление популярности рецептов по новым событиям. "
+        "Обработанные события удаляются"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=Limits.TRENDING_BATCH_SIZE,
+            help="Количество событий в пакете",
+        )
+
+    @transaction.atomic
+    def rollup(self, batch_size) -> int:
+        """Обрабатывает пакет событий, возвращает их количество."""
+        events = list(
+            RecipeEvent.objects.select_for_update()
+            .order_by("pk")
+            .values_list("pk", "recipe", "kind", "created")[:batch_size]
+        )
+        scores = {}
+        for _, recipe_id, kind, created in events:
+            score = log_score(created, EVENT_WEIGHTS[kind])
+            if recipe_id in scores:
+                score = add_log_scores(scores[recipe_id], score)
+            scores[recipe_id] = score
+        trends = RecipeTrend.objects.select_for_update().in_bulk(scores)
+        for recipe_id, score in scores.items():
+            if recipe_id in trends:
+                trends[recipe_id].score = add_log_scores(
+                    trends[recipe_id].score, score
+                )
+        RecipeTrend.objects.bulk_update(trends.values(), ("score",))
+        RecipeTrend.objects.bulk_create(
+            RecipeTrend(recipe_id=recipe_id, score=score)
+            for recipe_id, score in scores.items()
+            if recipe_id not in trends
+        )
+        RecipeEvent.objects.filter(
+            pk__in=[event[0] for event in events]
+        ).delete()
+        return len(events)
+
+    def handle(self, *args, **options):
+        processed = 0
+        while True:
+            count = self.rollup(options["batch_size"])
+            if not count:
+                break
+            processed += count
+            print(Messages.TRENDS_PROGRESS.format(processed))
+        # Рецепты, популярность которых опустилась ниже порога подборки
+        RecipeTrend.objects.filter(score__lt=min_log_score()).delete()
+        bump_version(TRENDS_VERSION)
+        print(self.style.SUCCESS(Messages.TABLE_UPDATE_FINISHED))
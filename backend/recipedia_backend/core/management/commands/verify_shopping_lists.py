@@ -0,0 +1,50 @@
+from django.core.management import BaseCommand
+
+from core.cache import bump_cart_versions
+from core.constants import Limits, Messages
+from recipes.models import ShoppingListItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Проверка списков покупок: пересчет по корзинам, сравнение с "
+        "сохраненными суммами и исправление расхождений"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=Limits.SHOPPING_LIST_BATCH_SIZE,
+            help="Количество пользователей в пакете",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только вывести расхождения, не исправляя их",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        user_ids = ShoppingListItem.objects.owner_ids()
+        mismatches_count = 0
+        for start in range(0, len(user_ids), batch_size):
+            mismatches = ShoppingListItem.objects.reconcile(
+                user_ids[start:start + batch_size], options["dry_run"]
+            )
+            for (user, ingredient), (stored, expected) in mismatches.items():
+                print(
+                    Messages.SHOPPING_LIST_MISMATCH.format(
+                        user, ingredient, stored, expected
+                    )
+                )
+            if not options["dry_run"]:
+                bump_cart_versions({user for user, _ in mismatches})
+            mismatches_count += len(mismatches)
+        print(
+            self.style.SUCCESS(
+                Messages.SHOPPING_LIST_CHECKED.format(
+                    len(user_ids), mismatches_count
+                )
+            )
+        )
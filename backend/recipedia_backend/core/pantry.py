@@ -0,0 +1,125 @@
+import threading
+from itertools import chain
+
+import numpy as np
+
+from core.cache import get_recipe_changes
+from recipes.models import Recipe
+
+
+class PantryMatrix:
+    """
+    Разреженная матрица рецепты x ингредиенты в формате CSR: id
+    ингредиентов рецептов записаны подряд в indices, строка i содержит
+    lengths[i] ингредиентов рецепта recipe_ids[i].
+    Матрица не изменяется: update возвращает новую матрицу.
+    """
+
+    def __init__(self, seq: int, recipe_ids, lengths, indices):
+        self.seq = seq
+        self.recipe_ids = recipe_ids
+        self.lengths = lengths
+        self.indices = indices
+        # Номер строки для каждого элемента indices
+        self.rows = np.repeat(np.arange(len(recipe_ids)), lengths)
+
+    @classmethod
+    def from_rows(cls, seq: int, rows) -> "PantryMatrix":
+        """Строит матрицу по парам (pk рецепта, id ингредиентов)."""
+        rows = list(rows)
+        recipe_ids = np.fromiter(
+            (pk for pk, _ in rows), dtype=np.int64, count=len(rows)
+        )
+        lengths = np.fromiter(
+            (len(ids) for _, ids in rows), dtype=np.int64, count=len(rows)
+        )
+        indices = np.fromiter(
+            chain.from_iterable(ids for _, ids in rows),
+            dtype=np.int64,
+            count=int(lengths.sum()),
+        )
+        return cls(seq, recipe_ids, lengths, indices)
+
+    @classmethod
+    def build(cls, seq: int) -> "PantryMatrix":
+        """Строит матрицу по всем рецептам."""
+        return cls.from_rows(
+            seq, Recipe.objects.values_list("pk", "ingredient_ids")
+        )
+
+    def update(self, seq: int, pks) -> "PantryMatrix":
+        """
+        Возвращает матрицу, в которой строки рецептов pks перечитаны из
+        базы данных (удаленные рецепты исключаются).
+        """
+        changed = self.from_rows(
+            seq,
+            Recipe.objects.filter(pk__in=pks).values_list(
+                "pk", "ingredient_ids"
+            ),
+        )
+        keep = ~np.isin(self.recipe_ids, np.fromiter(pks, dtype=np.int64))
+        return PantryMatrix(
+            seq,
+            np.concatenate((self.recipe_ids[keep], changed.recipe_ids)),
+            np.concatenate((self.lengths[keep], changed.lengths)),
+            np.concatenate((self.indices[keep[self.rows]], changed.indices)),
+        )
+
+    def rank(self, ingredient_ids, limit: int) -> list[tuple[int, float]]:
+        """
+        Возвращает до limit пар (pk рецепта, доля ингредиентов в наличии)
+        по убыванию доли, а при равной доле - по убыванию pk.
+        Рецепты без ингредиентов в наличии не возвращаются.
+        """
+        if not len(self.indices) or not ingredient_ids or limit <= 0:
+            return []
+        in_pantry = np.zeros(int(self.indices.max()) + 1, dtype=bool)
+        pantry = np.fromiter(ingredient_ids, dtype=np.int64)
+        in_pantry[pantry[pantry < len(in_pantry)]] = True
+        covered = np.bincount(
+            self.rows,
+            weights=in_pantry[self.indices],
+            minlength=len(self.recipe_ids),
+        )
+        scores = covered / np.maximum(self.lengths, 1)
+        candidates = np.flatnonzero(covered)
+        if len(candidates) > limit:
+            # Порог limit-й доли без полной сортировки всех рецептов
+            kth = np.partition(-scores[candidates], limit - 1)[limit - 1]
+            candidates = candidates[scores[candidates] >= -kth]
+        order = np.lexsort(
+            (-self.recipe_ids[candidates], -scores[candidates])
+        )
+        candidates = candidates[order][:limit]
+        return list(
+            zip(
+                self.recipe_ids[candidates].tolist(),
+                scores[candidates].tolist(),
+            )
+        )
+
+
+_matrix = None
+_lock = threading.Lock()
+
+
+def get_pantry_matrix() -> PantryMatrix:
+    """
+    Возвращает матрицу рецептов, применяя к ней изменения рецептов из
+    журнала. Если журнал неполон, матрица строится заново.
+    """
+    global _matrix
+    matrix = _matrix
+    seq, changed = get_recipe_changes(matrix.seq if matrix else None)
+    if changed is None or seq != matrix.seq:
+        with _lock:
+            # Матрицу могли обновить в другом потоке
+            if _matrix is matrix:
+                _matrix = (
+                    PantryMatrix.build(seq)
+                    if changed is None
+                    else matrix.update(seq, changed)
+                )
+            matrix = _matrix
+    return matrix
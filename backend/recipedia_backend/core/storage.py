@@ -0,0 +1,63 @@
+import hashlib
+import os
+
+from django.db import models
+from django.db.models.fields.files import ImageFieldFile
+
+
+def touch(storage, name: str) -> bool:
+    """
+    Если файл name есть в хранилище, обновляет время его изменения
+    и возвращает True. Повторно используемый файл после этого не
+    удаляется сборкой мусора до истечения ее отсрочки.
+    """
+    if not storage.exists(name):
+        return False
+    try:
+        os.utime(storage.path(name))
+    except NotImplementedError:
+        pass
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def content_hash(content) -> str:
+    """Хэш SHA-256 содержимого файла, прочитанного частями."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedFieldFile(ImageFieldFile):
+    """
+    Файл, сохраняемый под именем <каталог>/<xx>/<хэш содержимого>.<ext>,
+    где xx - первые символы хэша. Файл с тем же содержимым не
+    записывается повторно: поле ссылается на уже сохраненный.
+    """
+
+    def save(self, name, content, save=True):
+        digest = content_hash(content)
+        extension = os.path.splitext(name)[1].lower()
+        name = f"{digest[:2]}/{digest}{extension}"
+        path = self.field.generate_filename(self.instance, name)
+        if not touch(self.storage, path):
+            super().save(name, content, save)
+            return
+        self.name = path
+        setattr(self.instance, self.field.attname, self.name)
+        self._committed = True
+        if save:
+            self.instance.save()
+
+
+class ContentAddressedImageField(models.ImageField):
+    """
+    Картинка, хранимая по хэшу содержимого. Файлы не удаляются вместе
+    с объектами: на них могут ссылаться другие объекты, неиспользуемые
+    файлы удаляет команда gc_media.
+    """
+
+    attr_class = ContentAddressedFieldFile
@@ -0,0 +1,51 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.TASK_WORKERS, thread_name_prefix="recipedia-task"
+)
+_pending: dict = {}
+_lock = threading.RLock()
+
+
+def _run(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception("Ошибка фоновой задачи %s", func.__qualname__)
+        raise
+    finally:
+        # Соединения с базой данных принадлежат потоку задачи
+        connections.close_all()
+
+
+def submit(func, *args, **kwargs) -> Future:
+    """Выполняет func(*args, **kwargs) в пуле фоновых потоков процесса."""
+    return _executor.submit(_run, func, args, kwargs)
+
+
+def submit_once(key: str, func, *args, **kwargs) -> Future:
+    """
+    Выполняет func(*args, **kwargs) в пуле фоновых потоков процесса.
+    Пока задача с ключом key не завершена, повторные вызовы возвращают
+    ее, а не запускают новую.
+    """
+    with _lock:
+        future = _pending.get(key)
+        if future is None:
+            future = submit(func, *args, **kwargs)
+            _pending[key] = future
+            future.add_done_callback(lambda _: _forget(key, future))
+    return future
+
+
+def _forget(key: str, future: Future) -> None:
+    with _lock:
+        if _pending.get(key) is future:
+            del _pending[key]
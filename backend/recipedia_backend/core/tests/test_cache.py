@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from core.cache import get_recipe_representations, invalidate_recipes
+
+
+class RecipeRepresentationsTests(SimpleTestCase):
+    """Кэш общей части представлений рецептов."""
+
+    def setUp(self):
+        cache.clear()
+        self.recipes = [SimpleNamespace(pk=pk) for pk in (1, 2)]
+        self.data = {1: "1", 2: "2"}
+
+    def build(self, recipes):
+        return {recipe.pk: self.data[recipe.pk] for recipe in recipes}
+
+    def test_cached(self):
+        self.assertEqual(
+            get_recipe_representations(self.recipes, self.build), self.data
+        )
+        self.data = {1: "новый 1", 2: "новый 2"}
+        self.assertEqual(
+            get_recipe_representations(self.recipes, self.build),
+            {1: "1", 2: "2"},
+        )
+        invalidate_recipes([2])
+        self.assertEqual(
+            get_recipe_representations(self.recipes, self.build),
+            {1: "1", 2: "новый 2"},
+        )
+
+    def test_invalidated_while_building(self):
+        """
+        Представление, построенное до изменения рецепта и сохраненное
+        после его инвалидации, не читается из кэша.
+        """
+
+        def stale_build(recipes):
+            built = self.build(recipes)
+            self.data = {1: "новый 1", 2: "новый 2"}
+            invalidate_recipes([1])
+            return built
+
+        self.assertEqual(
+            get_recipe_representations(self.recipes, stale_build),
+            {1: "1", 2: "2"},
+        )
+        self.assertEqual(
+            get_recipe_representations(self.recipes, self.build),
+            {1: "новый 1", 2: "2"},
+        )
@@ -0,0 +1,23 @@
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase, override_settings
+
+from core.checks import check_shared_cache
+
+LOCMEM = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    """Проверка core.E001: кэш в памяти процесса только при DEBUG."""
+
+    @override_settings(CACHE_LOCAL_ALLOWED=False, CACHES=LOCMEM)
+    def test_local_cache_rejected(self):
+        errors = check_shared_cache(None)
+        self.assertEqual([error.id for error in errors], ["core.E001"])
+        self.assertIn(LocMemCache.__name__, errors[0].msg)
+        self.assertIn("CACHES", errors[0].hint)
+
+    @override_settings(CACHE_LOCAL_ALLOWED=True, CACHES=LOCMEM)
+    def test_local_cache_allowed(self):
+        self.assertEqual(check_shared_cache(None), [])
@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from core.images import variant_names
+from core.management.commands.gc_media import TRASH_DIR, Command
+from recipes.models import Recipe
+
+User = get_user_model()
+
+IMAGE = "recipes/images/aa/aaaa.jpg"
+OLD_IMAGE = "recipes/images/bb/bbbb.jpg"
+UNUSED = "recipes/images/cc/cccc.jpg"
+NEW_UNUSED = "recipes/images/dd/dddd.jpg"
+
+
+class GcMediaTests(TestCase):
+    """Удаление неиспользуемых картинок командой gc_media."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.old = time.time() - 2 * 60 * 60 * 24
+        variants = variant_names(IMAGE)
+        self.variants = list(variants.values())
+        self.old_variants = list(variant_names(OLD_IMAGE).values())
+        for name in (IMAGE, OLD_IMAGE, UNUSED, *self.variants):
+            self.create(name, self.old)
+        for name in self.old_variants:
+            self.create(name, self.old)
+        self.create(NEW_UNUSED, time.time())
+        author = User.objects.create_user(
+            username="author", email="author@example.com", password="pw"
+        )
+        # Варианты рецепта созданы по прежней картинке
+        Recipe.objects.create(
+            author=author,
+            name="рецепт",
+            text="текст",
+            cooking_time=10,
+            image=IMAGE,
+            image_variants={
+                "source": OLD_IMAGE,
+                **variant_names(OLD_IMAGE),
+            },
+        )
+        self.recipe = Recipe.objects.create(
+            author=author,
+            name="рецепт с вариантами",
+            text="текст",
+            cooking_time=10,
+            image=IMAGE,
+            image_variants={"source": IMAGE, **variants},
+        )
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.media_root, name)
+
+    def create(self, name: str, modified: float) -> None:
+        os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+        with open(self.path(name), "wb") as file:
+            file.write(name.encode())
+        os.utime(self.path(name), (modified, modified))
+
+    def call(self, *args):
+        call_command("gc_media", *args, stdout=StringIO())
+
+    def test_removes_unused(self):
+        with mock.patch("builtins.print"):
+            self.call()
+        for name in (IMAGE, NEW_UNUSED, *self.variants):
+            self.assertTrue(os.path.exists(self.path(name)), name)
+        for name in (OLD_IMAGE, UNUSED, *self.old_variants):
+            self.assertFalse(os.path.exists(self.path(name)), name)
+        self.assertEqual(os.listdir(self.path(TRASH_DIR)), ["recipes"])
+
+    def test_dry_run(self):
+        with mock.patch("builtins.print"):
+            self.call("--dry-run")
+        for name in (OLD_IMAGE, UNUSED, *self.old_variants):
+            self.assertTrue(os.path.exists(self.path(name)), name)
+
+    def test_reused_after_check(self):
+        """
+        Файл, повторно использованный после проверки ссылок, но до
+        удаления, возвращается из корзины.
+        """
+        cutoff = time.time() - 60 * 60 * 24
+        # Ссылка появилась после проверки ссылок при обходе каталога
+        Recipe.objects.filter(pk=self.recipe.pk).update(image=UNUSED)
+        self.assertFalse(Command().remove(UNUSED, cutoff))
+        # Файл обновлен core.storage.touch перед переносом в корзину
+        os.utime(self.path(NEW_UNUSED))
+        self.assertFalse(Command().remove(NEW_UNUSED, cutoff))
+        for name in (UNUSED, NEW_UNUSED):
+            self.assertTrue(os.path.exists(self.path(name)), name)
+            self.assertFalse(os.path.exists(self.path(TRASH_DIR + name)), name)
+        self.assertTrue(Command().remove(OLD_IMAGE, cutoff))
+        self.assertFalse(os.path.exists(self.path(OLD_IMAGE)))
+
+    def test_restores_trash(self):
+        """Файлы, оставшиеся в корзине после сбоя, возвращаются."""
+        trash = self.path(TRASH_DIR + IMAGE)
+        os.makedirs(os.path.dirname(trash))
+        os.replace(self.path(IMAGE), trash)
+        with mock.patch("builtins.print"):
+            self.call()
+        self.assertTrue(os.path.exists(self.path(IMAGE)))
+        self.assertFalse(os.path.exists(trash))
+
+    def test_storage_not_supported(self):
+        with mock.patch(
+            "core.management.commands.gc_media.default_storage", object()
+        ), self.assertRaises(CommandError):
+            self.call()
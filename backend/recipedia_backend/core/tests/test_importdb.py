@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import mock
+
+from api.tests.base import RecipeDataTestCase
+from django.core.management import call_command
+
+from core.cache import cart_version, get_version
+from core.management.commands.importdb import TABLE_NAMES
+from recipes.models import Recipe, ShoppingListItem
+
+
+class ImportDbTests(RecipeDataTestCase):
+    """
+    Производные данные, которые bulk_create не обновляет сигналами,
+    пересчитываются после импорта командой importdb.
+    """
+
+    def import_rows(self, **tables):
+        """Дополняет базу строками tables {таблица: [заголовок, строки]}."""
+        dir_name = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dir_name)
+        for table in TABLE_NAMES:
+            rows = tables.get(table, ["id"])
+            with open(
+                os.path.join(dir_name, table + ".csv"), "w", encoding="utf-8"
+            ) as csv_file:
+                csv_file.write("\n".join(rows) + "\n")
+        with mock.patch("builtins.input", return_value="2"), redirect_stdout(
+            StringIO()
+        ):
+            call_command("importdb", dir_name)
+
+    def test_ingredient_ids(self):
+        recipe = self.recipes[1]
+        ingredient = self.ingredients[9]
+        self.import_rows(
+            recipeingredient=[
+                "recipe,ingredient,amount",
+                f"{recipe.pk},{ingredient.pk},3",
+            ]
+        )
+        self.assertIn(
+            ingredient.pk,
+            Recipe.objects.values_list("ingredient_ids", flat=True).get(
+                pk=recipe.pk
+            ),
+        )
+
+    def test_shopping_lists(self):
+        """
+        Списки покупок пересчитываются по импортированным корзинам и
+        ингредиентам рецептов, версии измененных корзин обновляются.
+        """
+        user = self.users[1]
+        version = get_version(cart_version(user.pk))
+        self.import_rows(
+            recipeingredient=[
+                "recipe,ingredient,amount",
+                f"{self.recipes[1].pk},{self.ingredients[9].pk},3",
+            ],
+            shoppingcart=["user,recipe", f"{user.pk},{self.recipes[2].pk}"],
+        )
+        user_ids = [user.pk for user in self.users]
+        self.assertEqual(
+            ShoppingListItem.objects.stored_amounts(user_ids),
+            ShoppingListItem.objects.expected_amounts(user_ids),
+        )
+        self.assertTrue(ShoppingListItem.objects.filter(user=user))
+        self.assertTrue(
+            ShoppingListItem.objects.filter(
+                user=self.user, ingredient=self.ingredients[9], amount=3
+            )
+        )
+        self.assertGreater(get_version(cart_version(user.pk)), version)
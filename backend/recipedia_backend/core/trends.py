@@ -0,0 +1,55 @@
+import math
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from core.constants import Limits
+from recipes.models import RecipeEvent
+
+# Начало отсчета времени для оценок популярности, не изменять:
+# хранимые оценки отсчитаны от этой даты
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+DECAY_RATE = math.log(2) / Limits.TRENDING_HALF_LIFE
+
+# Веса событий в оценке популярности
+EVENT_WEIGHTS = {
+    RecipeEvent.FAVORITE: 1.0,
+    RecipeEvent.SHOPPING_CART: 0.5,
+}
+
+
+def log_score(moment: datetime, weight: float = 1.0) -> float:
+    """
+    Логарифм вклада события с весом weight в момент moment в оценку
+    популярности RecipeTrend.score.
+    """
+    return (
+        DECAY_RATE * (moment - EPOCH).total_seconds() + math.log(weight)
+    )
+
+
+def add_log_scores(first: float, second: float) -> float:
+    """Логарифм суммы exp(first) + exp(second) без переполнения."""
+    high, low = max(first, second), min(first, second)
+    return high + math.log1p(math.exp(low - high))
+
+
+def trending_moment(moment=None) -> datetime:
+    """
+    Начало интервала Limits.TRENDING_BUCKET, содержащего момент moment.
+    Порог подборки min_log_score растет со временем, поэтому подборка
+    и ее валидаторы (ETag, Last-Modified) вычисляются на начало интервала
+    и меняются вместе с ним.
+    """
+    seconds = ((moment or timezone.now()) - EPOCH).total_seconds()
+    return EPOCH + timedelta(
+        seconds=seconds - seconds % Limits.TRENDING_BUCKET
+    )
+
+
+def min_log_score(moment=None) -> float:
+    """
+    Минимальная оценка RecipeTrend.score рецептов подборки на момент
+    moment: текущая популярность не ниже Limits.TRENDING_MIN_SCORE.
+    """
+    return log_score(moment or timezone.now(), Limits.TRENDING_MIN_SCORE)
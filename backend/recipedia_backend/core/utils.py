@@ -1,8 +1,35 @@
-from django.db.models import Sum
+import csv
+from io import BytesIO
+from typing import Iterator, Optional, Union
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
-from tabulate import tabulate
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Table
+
+from core.cache import (
+    CATALOG_VERSION,
+    SHOPPING_LIST_KEY,
+    cart_version,
+    get_version,
+)
+from core.constants import Limits
+from core.tasks import submit_once
+from recipes.models import ShoppingListItem
+
+PDF_FONT_NAME = "ShoppingList"
 
-from recipes.models import RecipeIngredient
+
+class Echo:
+    """Буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value: str) -> str:
+        return value
 
 
 class ShoppingList:
@@ -10,28 +37,132 @@ class ShoppingList:
 
     TITLE: str = "Список покупок {first_name} {last_name}\n" "от {date}\n"
     HEADERS = ("Ингредиент", "Количество", "Ед.изм")
+    CONTENT_TYPES = {
+        "txt": "text/plain; charset=utf-8",
+        "csv": "text/csv; charset=utf-8",
+        "pdf": "application/pdf",
+    }
+    # Отметка в кэше вместо PDF, формирование которого не удалось
+    PDF_FAILED: str = "failed"
 
-    @classmethod
-    def get_table(cls, user) -> str:
-        """Возвращает список покупок пользователя user в табличном виде"""
-        ingredients = (
-            RecipeIngredient.objects.filter(
-                recipe__in_shopping_carts__user=user
-            )
-            .values("ingredient__name", "ingredient__unit__name")
-            .annotate(amount=Sum("amount"))
+    def __init__(self, user):
+        self.user = user
+        # Список зависит от корзины и наименований ингредиентов
+        self.version = "{}.{}".format(
+            get_version(cart_version(user.pk)),
+            get_version(CATALOG_VERSION),
         )
-        ingredients_table = (
-            (x["ingredient__name"], x["amount"], x["ingredient__unit__name"])
-            for x in ingredients
+
+    def cache_key(self, kind: str) -> str:
+        return SHOPPING_LIST_KEY.format(
+            kind=kind, pk=self.user.pk, version=self.version
         )
-        title = cls.TITLE.format(
-            username=user.username,
-            first_name=user.first_name,
-            last_name=user.last_name,
-            date=timezone.now(),
+
+    def get_rows(self) -> list[tuple]:
+        """
+        Возвращает строки списка покупок (ингредиент, количество,
+        единица измерения). Строки кэшируются до изменения корзины.
+        """
+        key = self.cache_key("rows")
+        rows = cache.get(key)
+        if rows is None:
+            rows = list(
+                ShoppingListItem.objects.filter(user=self.user)
+                .values_list(
+                    "ingredient__name", "amount", "ingredient__unit__name"
+                )
+                .order_by("ingredient__name")
+            )
+            cache.set(key, rows, Limits.SHOPPING_LIST_CACHE_TIMEOUT)
+        return rows
+
+    def get_title(self, date=None) -> str:
+        return self.TITLE.format(
+            username=self.user.username,
+            first_name=self.user.first_name,
+            last_name=self.user.last_name,
+            date=date or timezone.now(),
         )
-        table = tabulate(
-            ingredients_table, headers=cls.HEADERS, tablefmt="orgtbl"
+
+    def iter_txt(self) -> Iterator[str]:
+        """Список покупок в виде таблицы, построчно."""
+        rows = self.get_rows()
+        widths = [
+            max(len(str(value)) for value in column)
+            for column in zip(self.HEADERS, *rows)
+        ]
+
+        def line(values, amount_align=str.ljust) -> str:
+            name, amount, unit = (str(value) for value in values)
+            return "| {} | {} | {} |\n".format(
+                name.ljust(widths[0]),
+                amount_align(amount, widths[1]),
+                unit.ljust(widths[2]),
+            )
+
+        yield self.get_title()
+        yield line(self.HEADERS)
+        yield "|{}|\n".format("+".join("-" * (width + 2) for width in widths))
+        for row in rows:
+            yield line(row, str.rjust)
+
+    def iter_csv(self) -> Iterator[str]:
+        """Список покупок в формате CSV, построчно."""
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.HEADERS)
+        for row in self.get_rows():
+            yield writer.writerow(row)
+
+    def get_pdf(self) -> Optional[Union[bytes, str]]:
+        """
+        Возвращает список покупок в формате PDF из кэша. Если его там
+        нет, запускает формирование в фоновом потоке и возвращает None.
+        Если формирование не удалось, возвращает PDF_FAILED.
+        Заголовок PDF содержит дату формирования, поэтому она входит
+        в ключ кэша и PDF прошлых дней не возвращается.
+        """
+        date = timezone.localdate()
+        key = self.cache_key(f"pdf:{date.isoformat()}")
+        pdf = cache.get(key)
+        if pdf is None:
+            submit_once(
+                key,
+                self.render_pdf,
+                key,
+                self.get_title(date),
+                self.get_rows(),
+            )
+        return pdf
+
+    @classmethod
+    def render_pdf(cls, key: str, title: str, rows: list[tuple]) -> None:
+        """
+        Формирует список покупок в формате PDF и сохраняет в кэш. При
+        ошибке сохраняет в кэш отметку PDF_FAILED, чтобы запрос не
+        ожидал готовности бесконечно.
+        """
+        try:
+            pdf = cls.build_pdf(title, rows)
+        except Exception:
+            cache.set(
+                key, cls.PDF_FAILED, Limits.SHOPPING_LIST_FAILURE_TIMEOUT
+            )
+            raise
+        cache.set(key, pdf, Limits.SHOPPING_LIST_CACHE_TIMEOUT)
+
+    @classmethod
+    def build_pdf(cls, title: str, rows: list[tuple]) -> bytes:
+        """Список покупок в формате PDF."""
+        if PDF_FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, settings.PDF_FONT))
+        style = getSampleStyleSheet()["Title"]
+        style.fontName = PDF_FONT_NAME
+        table = Table([cls.HEADERS, *rows])
+        table.setStyle((("FONTNAME", (0, 0), (-1, -1), PDF_FONT_NAME),))
+        buffer = BytesIO()
+        SimpleDocTemplate(buffer, pagesize=A4).build(
+            # Заголовок содержит имя пользователя и разбирается как
+            # разметка Paragraph, поэтому экранируется
+            [Paragraph(escape(title).replace("\n", "<br/>"), style), table]
         )
-        return title + table
+        return buffer.getvalue()
@@ -23,6 +23,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "recipes.apps.RecipesConfig",
     "core.apps.CoreConfig",
     "rest_framework",
@@ -75,6 +76,36 @@ DATABASES = {
     }
 }
 
+# Кэш должен быть общим для всех процессов сервера и команд управления:
+# в нем хранятся версии данных, по которым строятся ETag и сбрасываются
+# копии данных. Кэш в памяти процесса допустим только при отладке
+CACHE_BACKEND = os.getenv(
+    "CACHE_BACKEND", "django.core.cache.backends.memcached.PyMemcacheCache"
+)
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.getenv("CACHE_LOCATION", "memcached:11211"),
+    }
+}
+# Кэш в памяти процесса без DEBUG отклоняет проверка core.E001.
+# Решение принимается здесь: запуск тестов сбрасывает DEBUG до проверок
+CACHE_LOCAL_ALLOWED = DEBUG
+if CACHE_BACKEND.endswith("LocMemCache"):
+    CACHES["default"]["OPTIONS"] = {"MAX_ENTRIES": 10_000}
+
+# Количество потоков для фоновых задач (core.tasks)
+TASK_WORKERS = int(os.getenv("TASK_WORKERS", 2))
+# Загружаемые файлы записываются во временный файл частями, без
+# накопления в памяти
+FILE_UPLOAD_HANDLERS = [
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler"
+]
+# Шрифт с кириллицей для PDF-файлов
+PDF_FONT = os.getenv(
+    "PDF_FONT", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+)
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -5,6 +5,7 @@ from .forms import TagAdminForm
 from .models import (
     Favorite,
     Ingredient,
+    PantryIngredient,
     Recipe,
     RecipeIngredient,
     ShoppingCart,
@@ -20,9 +21,14 @@ class UnitAdmin(admin.ModelAdmin):
 
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ("pk", "name", "unit")
+    list_select_related = ("unit",)
     search_fields = ("name",)
     list_filter = ("unit",)
 
+    def get_queryset(self, request):
+        # Наименование ингредиента в автодополнении включает единицу
+        return super().get_queryset(request).select_related("unit")
+
 
 class TagAdmin(admin.ModelAdmin):
     list_display = ("name", "color", "slug")
@@ -33,6 +39,10 @@ class RecipeIngredientInlineAdmin(admin.TabularInline):
     model = RecipeIngredient
     extra = 1
     min_num = 1
+    autocomplete_fields = ("ingredient",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("ingredient__unit")
 
 
 class RecipeAdmin(admin.ModelAdmin):
@@ -42,6 +52,7 @@ class RecipeAdmin(admin.ModelAdmin):
         "author",
         "get_tags",
         "cooking_time",
+        "favorites_count",
     )
     fields = (
         "author",
@@ -52,17 +63,29 @@ class RecipeAdmin(admin.ModelAdmin):
         "image",
         "image_preview",
         "pub_date",
-        "favorite_count",
+        "favorites_count",
     )
     inlines = [
         RecipeIngredientInlineAdmin,
     ]
-    readonly_fields = ("image_preview", "favorite_count", "pub_date")
+    readonly_fields = ("image_preview", "favorites_count", "pub_date")
+    autocomplete_fields = ("author",)
+    list_select_related = ("author",)
     search_fields = ("name", "author__first_name", "author__last_name")
     list_filter = ("tags",)
     save_on_top = True
     actions_on_top = True
 
+    def get_queryset(self, request):
+        # Поля, заполняемые базой данных и сигналами, не загружаются
+        # и не перезаписываются при сохранении рецепта
+        return (
+            super()
+            .get_queryset(request)
+            .defer("search_vector", "ingredient_ids")
+            .prefetch_related("tags")
+        )
+
     def image_preview(self, obj):
         if not obj.image:
             return ""
@@ -72,16 +95,9 @@ class RecipeAdmin(admin.ModelAdmin):
 
     image_preview.short_description = "Превью блюда"
 
-    def favorite_count(self, obj):
-        if obj.favorites.exists():
-            return str(obj.favorites.count())
-        return "0"
-
-    favorite_count.short_description = "Добавлений в избранное"
-
     @admin.display(description="Тэги")
     def get_tags(self, obj) -> str:
-        return ", ".join([tag.name for tag in obj.tags.all()])
+        return ", ".join(tag.name for tag in obj.tags.all())
 
 
 class RecipeIngredientAdmin(admin.ModelAdmin):
@@ -91,6 +107,8 @@ class RecipeIngredientAdmin(admin.ModelAdmin):
         "ingredient",
         "amount",
     )
+    list_select_related = ("recipe", "ingredient__unit")
+    autocomplete_fields = ("recipe", "ingredient")
     search_fields = (
         "recipe__name",
         "ingredient__name",
@@ -99,6 +117,7 @@ class RecipeIngredientAdmin(admin.ModelAdmin):
 
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = ("pk", "recipe", "user")
+    list_select_related = ("recipe", "user")
     search_fields = (
         "recipe__name",
         "user__first_name",
@@ -108,6 +127,7 @@ class FavoriteAdmin(admin.ModelAdmin):
 
 class SubscribeAdmin(admin.ModelAdmin):
     list_display = ("pk", "user", "author")
+    list_select_related = ("user", "author")
     search_fields = (
         "user__first_name",
         "user__last_name",
@@ -118,6 +138,7 @@ class SubscribeAdmin(admin.ModelAdmin):
 
 class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ("pk", "user", "recipe")
+    list_select_related = ("user", "recipe")
     search_fields = (
         "user__first_name",
         "user__last_name",
@@ -125,6 +146,16 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     )
 
 
+class PantryIngredientAdmin(admin.ModelAdmin):
+    list_display = ("pk", "user", "ingredient")
+    list_select_related = ("user", "ingredient__unit")
+    search_fields = (
+        "user__first_name",
+        "user__last_name",
+        "ingredient__name",
+    )
+
+
 admin.site.register(Unit, UnitAdmin)
 admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(Tag, TagAdmin)
@@ -133,6 +164,7 @@ admin.site.register(RecipeIngredient, RecipeIngredientAdmin)
 admin.site.register(Favorite, FavoriteAdmin)
 admin.site.register(Subscription, SubscribeAdmin)
 admin.site.register(ShoppingCart, ShoppingCartAdmin)
+admin.site.register(PantryIngredient, PantryIngredientAdmin)
 
 admin.site.site_header = "Административная панель Recipedia"
 admin.site.index_title = "Настройки Recipedia"
@@ -0,0 +1,25 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Триграммный индекс для поиска ингредиентов по подстроке и началу
+    наименования (lookup icontains/istartswith в PostgreSQL).
+    """
+
+    dependencies = [
+        ("recipes", "0004_recipe_recipe_pub_date_id_idx"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunSQL(
+            sql=(
+                "CREATE INDEX ingredient_name_trgm_idx "
+                "ON recipes_ingredient "
+                "USING gin (UPPER(name::text) gin_trgm_ops);"
+            ),
+            reverse_sql="DROP INDEX IF EXISTS ingredient_name_trgm_idx;",
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.2 on 2026-10-18 04:21
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+FILL_INGREDIENT_IDS_SQL = """
+UPDATE recipes_recipe SET ingredient_ids = COALESCE(
+    (
+        SELECT array_agg(DISTINCT ingredient_id ORDER BY ingredient_id)
+        FROM recipes_recipeingredient
+        WHERE recipe_id = recipes_recipe.id
+    ),
+    '{}'
+);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_favorite_favorite_user_recipe_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), default=list, editable=False, size=None, verbose_name='Идентификаторы ингредиентов'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['ingredient_ids'], name='recipe_ingredient_ids_idx'),
+        ),
+        migrations.RunSQL(
+            sql=FILL_INGREDIENT_IDS_SQL, reverse_sql=migrations.RunSQL.noop
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2 on 2026-10-18 04:31
+
+from django.db import migrations, models
+
+FILL_FAVORITES_COUNT_SQL = """
+UPDATE recipes_recipe SET favorites_count = (
+    SELECT COUNT(*)
+    FROM recipes_favorite
+    WHERE recipe_id = recipes_recipe.id
+);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_similarrecipe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в избранное'),
+        ),
+        migrations.RunSQL(
+            sql=FILL_FAVORITES_COUNT_SQL, reverse_sql=migrations.RunSQL.noop
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', '-pub_date', '-id'], name='recipe_favorites_count_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 3.2 on 2026-10-18 04:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_favorites_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('favorite', 'Добавление в избранное'), ('shopping_cart', 'Добавление в корзину покупок')], max_length=13, verbose_name='Тип события')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Время события')),
+            ],
+            options={
+                'verbose_name': 'Событие рецепта',
+                'verbose_name_plural': 'События рецептов',
+                'ordering': ('id',),
+            },
+        ),
+        migrations.CreateModel(
+            name='RecipeTrend',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trend', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('score', models.FloatField(verbose_name='Оценка популярности')),
+            ],
+            options={
+                'verbose_name': 'Популярность рецепта',
+                'verbose_name_plural': 'Популярность рецептов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recipetrend',
+            index=models.Index(fields=['-score'], name='recipe_trend_score_idx'),
+        ),
+        migrations.AddField(
+            model_name='recipeevent',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+    ]
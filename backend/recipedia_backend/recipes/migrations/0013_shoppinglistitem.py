@@ -0,0 +1,45 @@
+# Generated by Django 3.2 on 2026-10-18 04:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+FILL_SHOPPING_LISTS_SQL = """
+INSERT INTO recipes_shoppinglistitem (user_id, ingredient_id, amount)
+SELECT cart.user_id, item.ingredient_id, SUM(item.amount)
+FROM recipes_shoppingcart cart
+JOIN recipes_recipeingredient item ON item.recipe_id = cart.recipe_id
+GROUP BY cart.user_id, item.ingredient_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0012_recipeevent_recipetrend'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField(verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='in_shopping_lists', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Строка списка покупок',
+                'verbose_name_plural': 'Строки списков покупок',
+                'ordering': ('user',),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_user_list_item'),
+        ),
+        migrations.RunSQL(
+            sql=FILL_SHOPPING_LISTS_SQL, reverse_sql=migrations.RunSQL.noop
+        ),
+    ]
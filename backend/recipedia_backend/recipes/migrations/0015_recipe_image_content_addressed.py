@@ -0,0 +1,19 @@
+# Generated by Django 3.2 on 2026-10-18 04:46
+
+import core.storage
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=core.storage.ContentAddressedImageField(blank=True, null=True, upload_to='recipes/images/', verbose_name='Картинка блюда'),
+        ),
+    ]
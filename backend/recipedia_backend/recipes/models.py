@@ -1,8 +1,12 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connection, models, transaction
 
 from core.constants import Limits
+from core.storage import ContentAddressedImageField
 
 User = get_user_model()
 
@@ -79,6 +83,45 @@ class Tag(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Набор запросов рецептов."""
+
+    def with_user_flags(self, user):
+        """Аннотирует признаки избранного и корзины для пользователя user."""
+        if not user.is_authenticated:
+            return self
+        return self.annotate(
+            is_favorited=models.Exists(
+                Favorite.objects.filter(
+                    user=user, recipe=models.OuterRef("pk")
+                )
+            ),
+            is_in_shopping_cart=models.Exists(
+                ShoppingCart.objects.filter(
+                    user=user, recipe=models.OuterRef("pk")
+                )
+            ),
+        )
+
+    def update_ingredient_ids(self) -> None:
+        """
+        Обновляет индекс ингредиентов рецептов набора по RecipeIngredient
+        одним запросом ингредиентов и одним запросом UPDATE.
+        """
+        ingredients = {pk: set() for pk in self.values_list("pk", flat=True)}
+        for recipe_id, ingredient_id in RecipeIngredient.objects.filter(
+            recipe__in=ingredients
+        ).values_list("recipe", "ingredient"):
+            ingredients[recipe_id].add(ingredient_id)
+        self.model.objects.bulk_update(
+            [
+                self.model(pk=pk, ingredient_ids=sorted(ingredient_ids))
+                for pk, ingredient_ids in ingredients.items()
+            ],
+            ["ingredient_ids"],
+        )
+
+
 class Recipe(models.Model):
     """Модель рецепта."""
 
@@ -98,7 +141,7 @@ class Recipe(models.Model):
         verbose_name="Описание рецепта",
     )
 
-    image = models.ImageField(
+    image = ContentAddressedImageField(
         verbose_name="Картинка блюда",
         upload_to="recipes/images/",
         blank=True,
@@ -126,17 +169,86 @@ class Recipe(models.Model):
         verbose_name="Время добавления рецепта", auto_now_add=True
     )
 
+    # Отсортированные id ингредиентов рецепта. Индекс GIN по этому полю
+    # служит инвертированным индексом ингредиент -> рецепты.
+    ingredient_ids = ArrayField(
+        models.BigIntegerField(),
+        verbose_name="Идентификаторы ингредиентов",
+        default=list,
+        editable=False,
+    )
+
+    # Количество добавлений в избранное, изменяется сигналами Favorite
+    favorites_count = models.PositiveIntegerField(
+        verbose_name="Добавлений в избранное", default=0, editable=False
+    )
+
+    # Имена файлов уменьшенных копий картинки: {"source": имя картинки,
+    # по которой они созданы, вариант: имя файла}. Заполняется фоновой
+    # задачей core.images.build_image_variants
+    image_variants = models.JSONField(
+        verbose_name="Варианты картинки", default=dict, editable=False
+    )
+
+    # Заполняется триггером базы данных по полям name и text
+    search_vector = SearchVectorField(
+        verbose_name="Поисковый вектор", null=True, editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
         ordering = ("-pub_date",)
+        indexes = (
+            models.Index(
+                fields=("author", "-pub_date"), name="recipe_author_date_idx"
+            ),
+            models.Index(
+                fields=("-pub_date", "-id"), name="recipe_pub_date_id_idx"
+            ),
+            GinIndex(fields=("search_vector",), name="recipe_search_idx"),
+            GinIndex(
+                fields=("ingredient_ids",), name="recipe_ingredient_ids_idx"
+            ),
+            models.Index(
+                fields=("-favorites_count", "-pub_date", "-id"),
+                name="recipe_favorites_count_idx",
+            ),
+        )
+
+    # Поля, изменяемые только запросами UPDATE: сохранение рецепта
+    # не должно перезаписывать их прочитанными ранее значениями
+    UPDATE_ONLY_FIELDS = ("favorites_count", "image_variants")
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            deferred = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.attname
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.UPDATE_ONLY_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
     def get_formatted_text(self):
         return "<br>".join(self.text.splitlines())
 
+    def update_ingredient_ids(self):
+        """Обновляет индекс ингредиентов рецепта по RecipeIngredient."""
+        self.ingredient_ids = sorted(
+            set(self.recipeingredient_set.values_list("ingredient", flat=True))
+        )
+        Recipe.objects.filter(pk=self.pk).update(
+            ingredient_ids=self.ingredient_ids
+        )
+
 
 class RecipeIngredient(models.Model):
     """Ингредиент рецепта (с количеством)."""
@@ -188,6 +300,11 @@ class Favorite(models.Model):
         verbose_name = "Избранный рецепт пользователя."
         verbose_name_plural = "Избранные рецепты пользователей."
         ordering = ("user",)
+        indexes = (
+            models.Index(
+                fields=("user", "recipe"), name="favorite_user_recipe_idx"
+            ),
+        )
 
 
 class Subscription(models.Model):
@@ -248,3 +365,302 @@ class ShoppingCart(models.Model):
             ),
         )
         ordering = ("user",)
+
+
+class PantryIngredient(models.Model):
+    """Ингредиенты, имеющиеся у пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        related_name="pantry",
+        on_delete=models.CASCADE,
+        verbose_name="Пользователь",
+    )
+
+    ingredient = models.ForeignKey(
+        Ingredient,
+        related_name="in_pantries",
+        on_delete=models.CASCADE,
+        verbose_name="Ингредиент",
+    )
+
+    class Meta:
+        verbose_name = "Ингредиент в наличии"
+        verbose_name_plural = "Ингредиенты в наличии"
+        constraints = (
+            models.UniqueConstraint(
+                fields=["user", "ingredient"], name="unique_user_ingredient"
+            ),
+        )
+        ordering = ("user",)
+
+
+class SimilarRecipe(models.Model):
+    """
+    Похожие рецепты. Таблица заполняется командой build_similar_recipes.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        related_name="similar_recipes",
+        on_delete=models.CASCADE,
+        verbose_name="Рецепт",
+    )
+
+    similar = models.ForeignKey(
+        Recipe,
+        related_name="similar_to",
+        on_delete=models.CASCADE,
+        verbose_name="Похожий рецепт",
+    )
+
+    score = models.FloatField(verbose_name="Оценка сходства")
+
+    class Meta:
+        verbose_name = "Похожий рецепт"
+        verbose_name_plural = "Похожие рецепты"
+        constraints = (
+            models.UniqueConstraint(
+                fields=["recipe", "similar"], name="unique_recipe_similar"
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=("recipe", "-score"), name="similar_recipe_score_idx"
+            ),
+        )
+        ordering = ("recipe", "-score")
+
+
+class RecipeEvent(models.Model):
+    """
+    Добавления рецептов в избранное и корзину покупок.
+    События обрабатываются и удаляются командой rollup_trends.
+    """
+
+    FAVORITE = "favorite"
+    SHOPPING_CART = "shopping_cart"
+    KINDS = (
+        (FAVORITE, "Добавление в избранное"),
+        (SHOPPING_CART, "Добавление в корзину покупок"),
+    )
+
+    recipe = models.ForeignKey(
+        Recipe,
+        related_name="events",
+        on_delete=models.CASCADE,
+        verbose_name="Рецепт",
+    )
+
+    kind = models.CharField(
+        max_length=max(len(kind) for kind, _ in KINDS),
+        choices=KINDS,
+        verbose_name="Тип события",
+    )
+
+    created = models.DateTimeField(
+        verbose_name="Время события", auto_now_add=True
+    )
+
+    class Meta:
+        verbose_name = "Событие рецепта"
+        verbose_name_plural = "События рецептов"
+        ordering = ("id",)
+
+
+class RecipeTrend(models.Model):
+    """
+    Популярность рецепта с затуханием во времени. Хранится логарифм
+    суммы весов событий, умноженных на exp(время события / время
+    затухания) от фиксированной эпохи: затухание одинаково для всех
+    рецептов, поэтому порядок по этому значению - порядок по текущей
+    популярности, и новые события добавляются без пересчета старых.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        primary_key=True,
+        related_name="trend",
+        on_delete=models.CASCADE,
+        verbose_name="Рецепт",
+    )
+
+    score = models.FloatField(verbose_name="Оценка популярности")
+
+    class Meta:
+        verbose_name = "Популярность рецепта"
+        verbose_name_plural = "Популярность рецептов"
+        indexes = (
+            models.Index(fields=("-score",), name="recipe_trend_score_idx"),
+        )
+
+
+class ShoppingListItemQuerySet(models.QuerySet):
+    """Набор запросов строк списков покупок."""
+
+    UPSERT_SQL = """
+        INSERT INTO {table} (user_id, ingredient_id, amount)
+        SELECT * FROM unnest(%s::bigint[], %s::bigint[], %s::integer[])
+        ON CONFLICT (user_id, ingredient_id)
+        DO UPDATE SET amount = {table}.amount + EXCLUDED.amount
+    """
+
+    def apply(self, deltas: dict) -> None:
+        """
+        Изменяет количества ингредиентов в списках покупок на величины
+        deltas {(id пользователя, id ингредиента): изменение} одним
+        запросом INSERT ... ON CONFLICT и удаляет строки с количеством
+        не больше нуля.
+        """
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        user_ids, ingredient_ids = zip(*deltas)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                self.UPSERT_SQL.format(table=self.model._meta.db_table),
+                (list(user_ids), list(ingredient_ids), list(deltas.values())),
+            )
+        if any(delta < 0 for delta in deltas.values()):
+            self.filter(
+                user__in=set(user_ids),
+                ingredient__in=set(ingredient_ids),
+                amount__lte=0,
+            ).delete()
+
+    def add_recipe(self, user_id: int, recipe_id: int, sign: int = 1) -> None:
+        """
+        Добавляет ингредиенты рецепта recipe_id в список покупок
+        пользователя user_id (sign=-1 - вычитает их).
+        """
+        amounts = (
+            RecipeIngredient.objects.filter(recipe=recipe_id)
+            .values("ingredient")
+            .annotate(total=models.Sum("amount"))
+            .values_list("ingredient", "total")
+        )
+        self.apply(
+            {
+                (user_id, ingredient_id): sign * total
+                for ingredient_id, total in amounts
+            }
+        )
+
+    def add_ingredients(self, recipe_id: int, amounts: dict) -> None:
+        """
+        Изменяет списки покупок всех пользователей, у которых рецепт
+        recipe_id в корзине, на количества amounts {id ингредиента:
+        изменение}.
+        """
+        if not any(amounts.values()):
+            return
+        user_ids = ShoppingCart.objects.filter(recipe=recipe_id).values_list(
+            "user", flat=True
+        )
+        self.apply(
+            {
+                (user_id, ingredient_id): amount
+                for user_id in user_ids
+                for ingredient_id, amount in amounts.items()
+            }
+        )
+
+    def owner_ids(self) -> list:
+        """
+        Id пользователей по возрастанию, у которых есть корзина покупок
+        или строки списка покупок.
+        """
+        return sorted(
+            set(ShoppingCart.objects.values_list("user", flat=True))
+            | set(self.values_list("user", flat=True))
+        )
+
+    def expected_amounts(self, user_ids) -> dict:
+        """
+        Суммы ингредиентов по корзинам пользователей user_ids
+        {(id пользователя, id ингредиента): количество}.
+        """
+        totals = (
+            ShoppingCart.objects.filter(
+                user__in=user_ids,
+                recipe__recipeingredient__isnull=False,
+            )
+            .values("user", "recipe__recipeingredient__ingredient")
+            .annotate(total=models.Sum("recipe__recipeingredient__amount"))
+            .values_list(
+                "user", "recipe__recipeingredient__ingredient", "total"
+            )
+        )
+        return {
+            (user, ingredient): total for user, ingredient, total in totals
+        }
+
+    def stored_amounts(self, user_ids) -> dict:
+        """
+        Сохраненные суммы ингредиентов пользователей user_ids
+        {(id пользователя, id ингредиента): количество}.
+        """
+        return {
+            (user, ingredient): amount
+            for user, ingredient, amount in self.filter(
+                user__in=user_ids
+            ).values_list("user", "ingredient", "amount")
+        }
+
+    def reconcile(self, user_ids, dry_run: bool = False) -> dict:
+        """
+        Сравнивает списки покупок пользователей user_ids с пересчетом по
+        корзинам и, если не dry_run, исправляет их. Возвращает расхождения
+        {(id пользователя, id ингредиента): (сохранено, ожидается)}.
+        """
+        with transaction.atomic():
+            stored = self.stored_amounts(user_ids)
+            expected = self.expected_amounts(user_ids)
+            mismatches = {}
+            for key in sorted(stored.keys() | expected.keys()):
+                amounts = stored.get(key, 0), expected.get(key, 0)
+                if amounts[0] != amounts[1]:
+                    mismatches[key] = amounts
+            if not dry_run:
+                self.apply(
+                    {
+                        key: expected - stored
+                        for key, (stored, expected) in mismatches.items()
+                    }
+                )
+        return mismatches
+
+
+class ShoppingListItem(models.Model):
+    """
+    Сумма количеств ингредиента в рецептах корзины покупок пользователя.
+    Изменяется сигналами корзины покупок и ингредиентов рецептов.
+    """
+
+    user = models.ForeignKey(
+        User,
+        related_name="shopping_list",
+        on_delete=models.CASCADE,
+        verbose_name="Пользователь",
+    )
+
+    ingredient = models.ForeignKey(
+        Ingredient,
+        related_name="in_shopping_lists",
+        on_delete=models.CASCADE,
+        verbose_name="Ингредиент",
+    )
+
+    amount = models.IntegerField(verbose_name="Количество")
+
+    objects = ShoppingListItemQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Строка списка покупок"
+        verbose_name_plural = "Строки списков покупок"
+        constraints = (
+            models.UniqueConstraint(
+                fields=["user", "ingredient"], name="unique_user_list_item"
+            ),
+        )
+        ordering = ("user",)
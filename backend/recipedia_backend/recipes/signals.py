@@ -0,0 +1,223 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from core.cache import (
+    CATALOG_VERSION,
+    FAVORITES_VERSION,
+    bump_cart_versions,
+    bump_version,
+    cart_version,
+    invalidate_recipes,
+    user_version,
+)
+from core.images import schedule_image_variants
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    ShoppingListItem,
+    Subscription,
+    Tag,
+    Unit,
+)
+
+User = get_user_model()
+
+# Поля пользователя, входящие в кэшируемое представление рецепта
+AUTHOR_FIELDS = {"email", "username", "first_name", "last_name"}
+
+# Рецепты, ингредиенты которых изменены в текущем потоке. Их обрабатывает
+# первый вызов flush_recipe_ingredients после фиксации транзакции,
+# следующие вызовы ничего не делают. Рецепты из отмененной транзакции
+# обрабатываются со следующей: индекс строится по базе данных
+_changed_ingredients = threading.local()
+
+
+def invalidate_on_commit(pks) -> None:
+    pks = list(pks)
+    transaction.on_commit(lambda: invalidate_recipes(pks))
+
+
+def bump_catalog_on_commit() -> None:
+    transaction.on_commit(lambda: bump_version(CATALOG_VERSION))
+
+
+def bump_carts(recipe_ids) -> None:
+    """Обновляет версии корзин, содержащих рецепты recipe_ids."""
+    user_ids = (
+        ShoppingCart.objects.filter(recipe__in=recipe_ids)
+        .values_list("user", flat=True)
+        .distinct()
+    )
+    bump_cart_versions(user_ids)
+
+
+def bump_carts_on_commit(recipe_ids) -> None:
+    recipe_ids = list(recipe_ids)
+    transaction.on_commit(lambda: bump_carts(recipe_ids))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    invalidate_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    schedule_image_variants(instance)
+
+
+def flush_recipe_ingredients() -> None:
+    """
+    Обновляет индекс ингредиентов, кэш и версии корзин рецептов, чьи
+    ингредиенты изменены, - по одному разу для каждого рецепта.
+    """
+    recipe_ids = _changed_ingredients.__dict__.pop("recipe_ids", None)
+    if not recipe_ids:
+        return
+    Recipe.objects.filter(pk__in=recipe_ids).update_ingredient_ids()
+    invalidate_recipes(recipe_ids)
+    bump_carts(recipe_ids)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    recipe_ids = _changed_ingredients.__dict__.setdefault("recipe_ids", set())
+    recipe_ids.add(instance.recipe_id)
+    # Строка, перенесенная в другой рецепт, изменяет и прежний рецепт
+    # (instance.previous сохраняет recipe_ingredient_saving)
+    if getattr(instance, "previous", None):
+        recipe_ids.add(instance.previous[0])
+    transaction.on_commit(flush_recipe_ingredients)
+
+
+# Списки покупок изменяются по текущему состоянию базы данных: при
+# каскадном удалении рецепта его ингредиенты вычитаются либо при
+# удалении строки корзины, либо при удалении ингредиента рецепта,
+# смотря что удаляется раньше
+@receiver(pre_save, sender=RecipeIngredient)
+def recipe_ingredient_saving(sender, instance, **kwargs):
+    instance.previous = (
+        RecipeIngredient.objects.filter(pk=instance.pk)
+        .values_list("recipe", "ingredient", "amount")
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def recipe_ingredient_saved(sender, instance, **kwargs):
+    amounts = {instance.ingredient_id: instance.amount}
+    if instance.previous:
+        # Строку можно перенести в другой рецепт (в админке): прежнее
+        # количество вычитается из корзин прежнего рецепта
+        recipe_id, ingredient_id, amount = instance.previous
+        if recipe_id == instance.recipe_id:
+            amounts[ingredient_id] = amounts.get(ingredient_id, 0) - amount
+        else:
+            ShoppingListItem.objects.add_ingredients(
+                recipe_id, {ingredient_id: -amount}
+            )
+    ShoppingListItem.objects.add_ingredients(instance.recipe_id, amounts)
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_deleted(sender, instance, **kwargs):
+    ShoppingListItem.objects.add_ingredients(
+        instance.recipe_id, {instance.ingredient_id: -instance.amount}
+    )
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_added(sender, instance, created, **kwargs):
+    if created:
+        ShoppingListItem.objects.add_recipe(
+            instance.user_id, instance.recipe_id
+        )
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def shopping_cart_removed(sender, instance, **kwargs):
+    ShoppingListItem.objects.add_recipe(
+        instance.user_id, instance.recipe_id, sign=-1
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if isinstance(instance, Recipe):
+        invalidate_on_commit([instance.pk])
+    elif pk_set:
+        invalidate_on_commit(pk_set)
+    else:
+        bump_catalog_on_commit()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Unit)
+@receiver(post_delete, sender=Unit)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def catalog_changed(sender, **kwargs):
+    bump_catalog_on_commit()
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    if created or (update_fields and not AUTHOR_FIELDS & set(update_fields)):
+        return
+    invalidate_on_commit(instance.recipes.values_list("pk", flat=True))
+
+
+# Счетчик избранного изменяется в базе данных, без чтения его значения
+@receiver(post_save, sender=Favorite)
+def favorite_added(sender, instance, created, **kwargs):
+    if created:
+        Recipe.objects.filter(pk=instance.recipe_id).update(
+            favorites_count=F("favorites_count") + 1
+        )
+        transaction.on_commit(lambda: bump_version(FAVORITES_VERSION))
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_removed(sender, instance, **kwargs):
+    Recipe.objects.filter(pk=instance.recipe_id, favorites_count__gt=0).update(
+        favorites_count=F("favorites_count") - 1
+    )
+    transaction.on_commit(lambda: bump_version(FAVORITES_VERSION))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def user_state_changed(sender, instance, **kwargs):
+    name = user_version(instance.user_id)
+    transaction.on_commit(lambda: bump_version(name))
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def shopping_cart_changed(sender, instance, **kwargs):
+    name = cart_version(instance.user_id)
+    transaction.on_commit(lambda: bump_version(name))
@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Unit
+
+User = get_user_model()
+
+
+class IngredientIdsTests(TestCase):
+    """Индекс ингредиентов рецепта Recipe.ingredient_ids."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username="author", email="author@example.com", password="pw"
+        )
+        unit = Unit.objects.create(name="г")
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f"ингредиент {number}", unit=unit)
+            for number in range(5)
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                name=f"рецепт {number}",
+                author=author,
+                text="текст",
+                cooking_time=10,
+            )
+            for number in range(2)
+        ]
+
+    def ingredient_ids(self, recipe):
+        return Recipe.objects.values_list("ingredient_ids", flat=True).get(
+            pk=recipe.pk
+        )
+
+    def test_updated_once_per_recipe(self):
+        """
+        Индекс обновляется после фиксации транзакции одним запросом для
+        всех измененных рецептов, а не при каждом изменении ингредиента.
+        """
+        with self.captureOnCommitCallbacks() as callbacks:
+            for recipe in self.recipes:
+                for ingredient in reversed(self.ingredients):
+                    RecipeIngredient.objects.create(
+                        recipe=recipe, ingredient=ingredient, amount=1
+                    )
+        self.assertEqual(self.ingredient_ids(self.recipes[0]), [])
+        with CaptureQueriesContext(connection) as context:
+            for callback in callbacks:
+                callback()
+        updates = [
+            query["sql"]
+            for query in context.captured_queries
+            if '"ingredient_ids" = ' in query["sql"]
+        ]
+        self.assertEqual(len(updates), 1)
+        expected = sorted(ingredient.pk for ingredient in self.ingredients)
+        for recipe in self.recipes:
+            self.assertEqual(self.ingredient_ids(recipe), expected)
+
+    def test_deleted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for ingredient in self.ingredients[:3]:
+                RecipeIngredient.objects.create(
+                    recipe=self.recipes[0], ingredient=ingredient, amount=1
+                )
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeIngredient.objects.filter(
+                ingredient=self.ingredients[0]
+            ).delete()
+        self.assertEqual(
+            self.ingredient_ids(self.recipes[0]),
+            [ingredient.pk for ingredient in self.ingredients[1:3]],
+        )
+
+    def test_row_moved_to_other_recipe(self):
+        """Перенос строки в другой рецепт обновляет индексы обоих."""
+        first, second = self.recipes
+        with self.captureOnCommitCallbacks(execute=True):
+            for ingredient in self.ingredients[:3]:
+                RecipeIngredient.objects.create(
+                    recipe=first, ingredient=ingredient, amount=1
+                )
+        row = RecipeIngredient.objects.get(
+            recipe=first, ingredient=self.ingredients[0]
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            row.recipe = second
+            row.save()
+        self.assertEqual(
+            self.ingredient_ids(first),
+            [ingredient.pk for ingredient in self.ingredients[1:3]],
+        )
+        self.assertEqual(self.ingredient_ids(second), [self.ingredients[0].pk])
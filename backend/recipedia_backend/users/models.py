@@ -1,9 +1,32 @@
+from django.apps import apps
 from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import UserManager as DjangoUserManager
 from django.db import models
 
 from core.constants import Limits
 
 
+class UserQuerySet(models.QuerySet):
+    """Набор запросов пользователей."""
+
+    def with_is_subscribed(self, user):
+        """Аннотирует признак подписки пользователя user на автора."""
+        if not user.is_authenticated:
+            return self
+        subscription = apps.get_model("recipes", "Subscription")
+        return self.annotate(
+            is_subscribed=models.Exists(
+                subscription.objects.filter(
+                    user=user, author=models.OuterRef("pk")
+                )
+            )
+        )
+
+
+class UserManager(DjangoUserManager.from_queryset(UserQuerySet)):
+    pass
+
+
 class User(AbstractUser):
     """
     Модель пользователя платформы.
@@ -31,6 +54,8 @@ class User(AbstractUser):
         max_length=Limits.LAST_NAME_LENGTH,
     )
 
+    objects = UserManager()
+
     class Meta:
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"